@@ -1,289 +1,647 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import re
-from datetime import datetime
-from io import BytesIO
-
-# Function to extract client name from Site Alias
-def extract_client(site_alias):
-    match = re.search(r'\((.*?)\)', site_alias)
-    return match.group(1) if match else None
-
-# Function to categorize Duration Slot (Hours)
-def categorize_duration(hours):
-    if 0 <= hours < 2:
-        return '0+'
-    elif 2 <= hours < 4:
-        return '2+'
-    elif 4 <= hours < 8:
-        return '4+'
-    elif hours >= 8:
-        return '8+'
-    else:
-        return 'Unknown'
+import csv
+import hashlib
+import functools
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from io import BytesIO, StringIO
+from itertools import islice
+from operator import itemgetter
+from openpyxl import load_workbook
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import xlsxwriter
+
+# Structured stage timings are logged as JSON lines on this logger
+logger = logging.getLogger('statusmatrix')
+
+# Memory ceiling of the parse cache shared by all sessions of the server
+PARSE_CACHE_MAX_BYTES = int(os.environ.get('STATUSMATRIX_CACHE_MAX_MB', '1024')) * 2 ** 20
+
+# Wall-clock budget in seconds shared by the concurrent parses of the two uploads
+PARSE_BUDGET_SECONDS = 120
+
+# Names of the uploads in error messages, by report kind
+UPLOAD_LABELS = {
+    'alarm': 'Current Alarms Report',
+    'offline': 'Offline Report',
+}
+
+# Uploads larger than this are aggregated in chunks instead of loaded as one frame
+STREAMING_THRESHOLD_BYTES = 50 * 1024 * 1024
+
+# Rows per chunk when streaming a workbook
+STREAM_CHUNK_ROWS = 50000
+
+# Duration Slot (Hours) bucket edges; each edge starts an '<edge>+' category
+DURATION_BUCKET_EDGES = [0, 2, 4, 8]
+
+# Offline Report duration classes in hours, as written in the 'Duration' text
+OFFLINE_DURATION_HOURS = [24, 48, 72]
+
+# Columns read from each report and the type applied to them at load time
+REPORT_SCHEMAS = {
+    'alarm': {
+        'RMS Station': 'object',
+        'Cluster': 'category',
+        'Zone': 'category',
+        'Site Alias': 'object',
+        'Alarm Name': 'category',
+        'Alarm Time': 'datetime',
+        'Duration': 'object',
+        'Duration Slot (Hours)': 'float',
+    },
+    'offline': {
+        'Site': 'object',
+        'Site Alias': 'object',
+        'Zone': 'category',
+        'Cluster': 'category',
+        'Last Online Time': 'datetime',
+        'Duration': 'category',
+    },
+}
+
+# Formats of the datetime columns as exported by RMS
+DATETIME_FORMATS = {
+    'Alarm Time': '%d/%m/%Y %I:%M:%S %p',
+    'Last Online Time': '%Y-%m-%d %H:%M:%S',
+}
+
+# Date tokens of a report's row 2 text, in the forms RMS writes them: ISO, or day-first with an optional AM/PM clock
+REPORT_TIME_PATTERN = re.compile(
+    r'\d{4}-\d{1,2}-\d{1,2}(?:[ T]\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?'
+    r'|\d{1,2}/\d{1,2}/\d{4}(?: \d{1,2}:\d{2}(?::\d{2})?(?: ?[AP]M)?)?',
+    re.IGNORECASE,
+)
+
+# Formats a report's date token is read with, tried in order
+REPORT_TIME_FORMATS = [
+    '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%dT%H:%M', '%Y-%m-%d',
+    '%d/%m/%Y %I:%M:%S %p', '%d/%m/%Y %I:%M:%S%p', '%d/%m/%Y %I:%M %p', '%d/%m/%Y %I:%M%p',
+    '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y',
+]
+
+# File types accepted for the reports; the format of an upload is told from its content
+REPORT_FILE_TYPES = ['xlsx', 'csv', 'parquet']
+
+# Bytes read from the top of a CSV report to find its timestamp and header rows
+CSV_PREAMBLE_BYTES = 64 * 1024
+
+# Columns the Current Alarms Report must provide
+ALARM_REQUIRED_COLUMNS = ['RMS Station', 'Cluster', 'Zone', 'Site Alias', 'Alarm Name', 'Alarm Time', 'Duration Slot (Hours)']
+
+# Alarms shown first in the Current Alarms Report, in this order
+ALARM_PRIORITY_ORDER = [
+    'Mains Fail',
+    'Battery Low',
+    'DCDB-01 Primary Disconnect',
+    'PG Run',
+    'MDB Fault',
+    'Door Open'
+]
+
+# Columns identifying one alarm occurrence when comparing consecutive reports
+ALARM_DELTA_KEY = ['Site Alias', 'Alarm Name', 'Alarm Time']
+
+# Columns identifying one row when several uploads of a report are merged; a row whose key came from an earlier
+# file is dropped
+MERGE_KEYS = {
+    'alarm': ALARM_DELTA_KEY,
+    'offline': ['Site', 'Site Alias'],
+}
+
+# Client name is the first parenthesised part of Site Alias, e.g. 'XYZ (CLIENT)'
+CLIENT_PATTERN = re.compile(r'\((.*?)\)')
+
+# Directory holding the columnar snapshot of every ingested report; empty disables snapshots
+SNAPSHOT_DIR = os.environ.get('STATUSMATRIX_SNAPSHOT_DIR', 'snapshots')
+
+# Index of the snapshots kept in a snapshot directory
+SNAPSHOT_INDEX_FILE = 'index.json'
+
+# Directory holding the reports precomputed by the folder watcher (watch_reports.py); empty hides them
+PRECOMPUTED_DIR = os.environ.get('STATUSMATRIX_PRECOMPUTED_DIR', 'precomputed')
+
+# Manifest of a precomputed report directory: report times, alarm names and the files holding its tables
+PRECOMPUTED_MANIFEST_FILE = 'manifest.json'
+
+# Arrow column types used to store each report schema type
+SNAPSHOT_ARROW_TYPES = {
+    'object': pa.string(),
+    'category': pa.string(),
+    'float': pa.float64(),
+    'datetime': pa.timestamp('ns'),
+}
+
+# Subdirectory of the snapshot directory holding one rollup part of aggregate counts per snapshot, named like it
+ROLLUP_DIR = 'rollup'
+
+# Dimensions of the rollup counts of each report kind
+ROLLUP_DIMENSIONS = {
+    'alarm': ['Alarm Name', 'Cluster', 'Zone', 'Duration Category'],
+    'offline': ['Cluster', 'Zone', 'Duration Class'],
+}
+
+# Days of history shown in the trend view, counted back from the latest report
+TREND_DAYS = 30
+
+# Frames with more rows than this are rendered without cell styling
+STYLE_MAX_ROWS = 5000
+
+# Columns of the site-wise and offline site logs
+SITE_WISE_LOG_COLUMNS = ['Site Alias', 'Cluster', 'Zone', 'Alarm Name', 'Alarm Time', 'Duration']
+OFFLINE_LOG_COLUMNS = ['Site', 'Site Alias', 'Zone', 'Cluster', 'Last Online Time', 'Duration']
+
+# Page sizes offered for the site logs, only the visible page is sent to the browser
+LOG_PAGE_SIZES = [100, 500, 1000]
+
+# Stage records of the current run (one page rerun, or one batch pair) and the context logged with them
+STAGE_RECORDS = []
+RUN_CONTEXT = {}
+
+# Function to read the resident memory of this process, where the platform exposes it
+def current_rss():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
 
-# Function to create pivot table for a specific alarm
-def create_pivot_table(df, alarm_name):
-    alarm_df = df[df['Alarm Name'] == alarm_name].copy()
-    
-    if alarm_name == 'DCDB-01 Primary Disconnect':
-        alarm_df = alarm_df[~alarm_df['RMS Station'].str.startswith('L')]
-    
-    # Categorize Duration Slot (Hours)
-    alarm_df['Duration Category'] = alarm_df['Duration Slot (Hours)'].apply(categorize_duration)
-    
-    # Create pivot tables for each Duration Category
-    pivot_total = pd.pivot_table(
-        alarm_df,
-        index=['Cluster', 'Zone'],
-        columns='Client',
-        values='Site Alias',
-        aggfunc='count',
-        fill_value=0
-    ).reset_index()
-    
-    client_columns = [col for col in pivot_total.columns if col not in ['Cluster', 'Zone']]
-    pivot_total['Total'] = pivot_total[client_columns].sum(axis=1)
-    
-    # Pivot for Duration Categories
-    pivot_duration = pd.pivot_table(
-        alarm_df,
-        index=['Cluster', 'Zone'],
-        columns='Duration Category',
-        values='Site Alias',
-        aggfunc='count',
-        fill_value=0
+# Function to count the rows of a stage's input or output
+def count_rows(value):
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    return None
+
+# Function to time a block of work and record its wall time, rows in/out and memory delta
+@contextmanager
+def timed_stage(stage, rows_in=None):
+    record = {'stage': stage, 'rows_in': rows_in, 'rows_out': None}
+    rss_before = current_rss()
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['seconds'] = round(time.perf_counter() - start, 6)
+        rss_after = current_rss()
+        record['memory_delta_bytes'] = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+        STAGE_RECORDS.append(record)
+        logger.info(json.dumps({'event': 'stage', **RUN_CONTEXT, **record}, default=str))
+
+# Function to instrument a pipeline function as a stage named after it
+def instrument(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with timed_stage(fn.__name__, count_rows(args[0]) if args else None) as record:
+            result = fn(*args, **kwargs)
+            record['rows_out'] = count_rows(result)
+        return result
+    return wrapper
+
+# Function to summarise the stage records of the current run for the Diagnostics panel
+def stage_summary():
+    if not STAGE_RECORDS:
+        return pd.DataFrame(columns=['stage', 'calls', 'seconds', 'rows_in', 'rows_out', 'memory_delta_mb'])
+    records = pd.DataFrame(STAGE_RECORDS)
+    summary = records.groupby('stage', sort=False).agg(
+        calls=('stage', 'size'),
+        seconds=('seconds', 'sum'),
+        rows_in=('rows_in', 'max'),
+        rows_out=('rows_out', 'max'),
+        memory_delta_mb=('memory_delta_bytes', 'sum'),
     ).reset_index()
-    
-    # Merge the two pivot tables
-    pivot = pd.merge(pivot_total, pivot_duration, on=['Cluster', 'Zone'], how='left')
-    
-    # Ensure all Duration Categories are present
-    for cat in ['0+', '2+', '4+', '8+']:
-        if cat not in pivot.columns:
-            pivot[cat] = 0
-    
-    # Reorder columns: Original client columns + 'Total' + Duration Categories
-    pivot = pivot[['Cluster', 'Zone'] + client_columns + ['Total', '0+', '2+', '4+', '8+']]
-    
-    # Add Total row
-    numeric_cols = pivot.select_dtypes(include=['number']).columns
-    total_row = pivot[numeric_cols].sum().to_frame().T
-    total_row[['Cluster', 'Zone']] = ['Total', '']
-    
-    # Replace numeric columns in total_row with empty strings
-    total_row[numeric_cols] = total_row[numeric_cols].replace(0, "0").astype(str)
-    
-    pivot = pd.concat([pivot, total_row], ignore_index=True)
-    
-    total_alarm_count = pivot['Total'].iloc[-1]
-    
-    # Remove repeated Cluster names for better readability
-    last_cluster = None
-    for i in range(len(pivot)):
-        if pivot.at[i, 'Cluster'] == last_cluster:
-            pivot.at[i, 'Cluster'] = ''
-        else:
-            last_cluster = pivot.at[i, 'Cluster']
-    
-    return pivot, total_alarm_count
-
-import pandas as pd
-
-# Function to create pivot table for offline report
-def create_offline_pivot(df):
-    df = df.drop_duplicates()
-    
-    # Create new columns for each duration category
-    df['Less than 24 hours'] = df['Duration'].apply(lambda x: 1 if 'Less than 24 hours' in x else 0)
-    df['More than 24 hours'] = df['Duration'].apply(lambda x: 1 if 'More than 24 hours' in x and '72' not in x else 0)
-    df['More than 48 hours'] = df['Duration'].apply(lambda x: 1 if 'More than 48 hours' in x else 0)
-    df['More than 72 hours'] = df['Duration'].apply(lambda x: 1 if 'More than 72 hours' in x else 0)
-    
-    pivot = df.groupby(['Cluster', 'Zone']).agg({
-        'Less than 24 hours': 'sum',
-        'More than 24 hours': 'sum',
-        'More than 48 hours': 'sum',  # Include the new column here
-        'More than 72 hours': 'sum',
-        'Site Alias': 'nunique'
-    }).reset_index()
-
-    pivot = pivot.rename(columns={'Site Alias': 'Total'})
-    
-    total_row = pivot[['Less than 24 hours', 'More than 24 hours', 'More than 48 hours', 'More than 72 hours', 'Total']].sum().to_frame().T
-    total_row[['Cluster', 'Zone']] = ['Total', '']
-    
-    # Replace numeric columns in total_row with empty strings
-    numeric_cols = ['Less than 24 hours', 'More than 24 hours', 'More than 48 hours', 'More than 72 hours', 'Total']
-    total_row[numeric_cols] = total_row[numeric_cols].replace(0, "0").astype(str)
-    
-    pivot = pd.concat([pivot, total_row], ignore_index=True)
-    
-    total_offline_count = int(pivot['Total'].iloc[-1])
-    
-    last_cluster = None
-    for i in range(len(pivot)):
-        if pivot.at[i, 'Cluster'] == last_cluster:
-            pivot.at[i, 'Cluster'] = ''
-        else:
-            last_cluster = pivot.at[i, 'Cluster']
-    
-    return pivot, total_offline_count
+    summary['memory_delta_mb'] = (summary['memory_delta_mb'] / 2 ** 20).round(1)
+    return summary.sort_values('seconds', ascending=False, ignore_index=True)
+
+# Function to extract client names from the Site Alias column as a categorical
+def extract_clients(site_alias):
+    return site_alias.str.extract(CLIENT_PATTERN, expand=False).astype('category')
+
+# Function to build the Duration Category labels for a set of bucket edges
+def duration_labels(edges=DURATION_BUCKET_EDGES):
+    return [f"{edge:g}+" for edge in edges]
+
+# Function to categorize Duration Slot (Hours) into edge-based buckets; values below the first edge are 'Unknown'
+def categorize_durations(hours, edges=DURATION_BUCKET_EDGES):
+    labels = duration_labels(edges)
+    hours = pd.to_numeric(hours, errors='coerce').to_numpy(dtype=float)
+    codes = np.searchsorted(np.asarray(edges, dtype=float), hours, side='right') - 1
+    codes = np.where(hours >= edges[0], codes, len(labels))
+    return pd.Categorical.from_codes(codes, categories=labels + ['Unknown'])
+
+# Function to build the offline duration column names for a set of offline classes
+def offline_duration_labels(hours=OFFLINE_DURATION_HOURS):
+    return [f"Less than {hours[0]} hours"] + [f"More than {h} hours" for h in hours]
+
+# Function to flag each offline duration class, matching against the distinct Duration values only
+def classify_offline_durations(duration, hours=OFFLINE_DURATION_HOURS):
+    codes, uniques = pd.factorize(duration)
+    text = pd.Series(uniques, dtype=object).astype(str)
+
+    flags = {f"Less than {hours[0]} hours": text.str.contains(f"Less than {hours[0]} hours", regex=False)}
+    for h in hours:
+        flags[f"More than {h} hours"] = text.str.contains(f"More than {h} hours", regex=False)
+    # The first 'More than' class excludes durations that mention the last class
+    first_more = f"More than {hours[0]} hours"
+    flags[first_more] &= ~text.str.contains(str(hours[-1]), regex=False)
+
+    # Missing Duration values (code -1) pick up the trailing 0
+    return pd.DataFrame(
+        {label: np.append(flag.to_numpy(dtype=np.int64), 0)[codes] for label, flag in flags.items()},
+        index=duration.index
+    )
 
-    
-    # Replace numeric columns in total_row with empty strings
-    numeric_cols = ['Less than 24 hours', 'More than 24 hours','More than 48 hours', 'More than 72 hours', 'Total']
-    total_row[numeric_cols] = total_row[numeric_cols].replace(0, "0").astype(str)
-    
-    pivot = pd.concat([pivot, total_row], ignore_index=True)
-    
-    total_offline_count = int(pivot['Total'].iloc[-1])
-    
-    last_cluster = None
-    for i in range(len(pivot)):
-        if pivot.at[i, 'Cluster'] == last_cluster:
-            pivot.at[i, 'Cluster'] = ''
-        else:
-            last_cluster = pivot.at[i, 'Cluster']
-    
-    return pivot, total_offline_count
+# Function to order alarm names: prioritized alarms first, then the rest in their given order
+def order_alarm_names(alarm_names):
+    prioritized_alarms = [name for name in ALARM_PRIORITY_ORDER if name in alarm_names]
+    non_prioritized_alarms = [name for name in alarm_names if name not in ALARM_PRIORITY_ORDER]
+    return prioritized_alarms + non_prioritized_alarms
 
-    # Setting empty cells for the '48+' column if the value is zero
-    pivot['More than 48 hours'] = pivot['More than 48 hours'].replace("", "0")  # This line ensures that if the value is 0, it stays empty
+# Function to build a compact alarm count cube with a single groupby over all alarms
+@instrument
+def build_alarm_cube(df, edges=DURATION_BUCKET_EDGES):
+    # Exclude RMS Stations starting with 'L' for DCDB-01 Primary Disconnect
+    rms_prefix = df['RMS Prefix'] if 'RMS Prefix' in df.columns else df['RMS Station'].astype(str).str[:1]
+    excluded = (df['Alarm Name'] == 'DCDB-01 Primary Disconnect') & (rms_prefix == 'L')
+    df = df.loc[~excluded, ['Alarm Name', 'Cluster', 'Zone', 'Client', 'Site Alias', 'Duration Slot (Hours)']]
 
-    return pivot, total_offline_count
+    # Categorize Duration Slot (Hours)
+    duration_category = pd.Series(
+        categorize_durations(df['Duration Slot (Hours)'], edges), index=df.index, name='Duration Category'
+    )
 
+    # Count Site Alias per (Alarm Name, Cluster, Zone, Client, Duration Category)
+    cube = df.groupby(
+        [df['Alarm Name'], df['Cluster'], df['Zone'], df['Client'], duration_category], observed=True
+    )['Site Alias'].count()
+    return cube
+
+# Function to create the pivot table for a specific alarm from a slice of the count cube
+@instrument
+def pivot_from_cube(cube, alarm_name, edges=DURATION_BUCKET_EDGES):
+    if alarm_name in cube.index.get_level_values('Alarm Name'):
+        counts = cube.xs(alarm_name, level='Alarm Name')
+    else:
+        counts = cube.iloc[:0].droplevel('Alarm Name')
+
+    # Client counts per Cluster/Zone
+    pivot = counts.groupby(level=['Cluster', 'Zone', 'Client'], observed=True).sum().unstack('Client', fill_value=0)
+    pivot.columns = pd.Index(list(pivot.columns), name='Client')
+    client_columns = list(pivot.columns)
+    pivot['Total'] = pivot[client_columns].sum(axis=1)
+
+    # Duration Category counts per Cluster/Zone, ensuring all categories are present
+    duration_cols = duration_labels(edges)
+    pivot_duration = counts.groupby(level=['Cluster', 'Zone', 'Duration Category'], observed=True).sum() \
+        .unstack('Duration Category', fill_value=0)
+    pivot_duration.columns = list(pivot_duration.columns)
+    pivot_duration = pivot_duration.reindex(columns=duration_cols, fill_value=0)
+    pivot = pivot.join(pivot_duration).reset_index()
 
+    # Reorder columns: Original client columns + 'Total' + Duration Categories
+    count_cols = client_columns + ['Total'] + duration_cols
+    pivot = pivot[['Cluster', 'Zone'] + count_cols].astype({col: 'int64' for col in count_cols})
     
-    # Replace numeric columns in total_row with empty strings
-    numeric_cols = ['Less than 24 hours', 'More than 24 hours','More than 48 hours', 'More than 72 hours', 'Total']
-    total_row[numeric_cols] = total_row[numeric_cols].replace(0, "0").astype(str)
-    
-    pivot = pd.concat([pivot, total_row], ignore_index=True)
-    
-    total_offline_count = int(pivot['Total'].iloc[-1])
-    
-    last_cluster = None
-    for i in range(len(pivot)):
-        if pivot.at[i, 'Cluster'] == last_cluster:
-            pivot.at[i, 'Cluster'] = ''
-        else:
-            last_cluster = pivot.at[i, 'Cluster']
-    
-    return pivot, total_offline_count
-
-# Function to calculate time offline smartly (minutes, hours, or days) and filter for durations > 1 day
-def calculate_duration(df):
-    current_time = datetime.now()
-    df['Last Online Time'] = pd.to_datetime(df['Last Online Time'], format='%Y-%m-%d %H:%M:%S')
-    df['Hours Offline'] = (current_time - df['Last Online Time']).dt.total_seconds() / 3600
-
-    def format_offline_duration(hours):
-        if hours < 1:
-            return f"{int(hours * 60)} minutes"
-        elif hours < 24:
-            return f"{int(hours)} hours"
-        else:
-            return f"{int(hours // 24)} days"
-
-    df['Offline Duration'] = df['Hours Offline'].apply(format_offline_duration)
-
-# Filter rows where duration is more than 1 day
-    df_filtered = df[df['Hours Offline'] > 24]
-
-    return df_filtered[['Offline Duration', 'Site Alias', 'Cluster', 'Zone', 'Last Online Time']]
-
-    def show_offline_site_log(file):
-        # Read the uploaded file, skipping the first row (assuming row 2 is where headers start)
-        df = pd.read_excel(file, header=1)  # Skip the first row, set header to row 2
-        
-        # Select the necessary columns to display
-        columns_to_display = ['Site', 'Site Alias', 'Zone', 'Cluster', 'Last Online Time', 'Duration']
-        
-        # Check if the necessary columns exist in the dataframe
-        if all(col in df.columns for col in columns_to_display):
-            # Filter the dataframe to only show the required columns
-            df = df[columns_to_display]
-            
-            # Display the dataframe (you can return this in a template for a web app)
-            return df
-        else:
-            return "Required columns are missing in the uploaded file."
-
-    # Apply the conversion function to the 'Duration_in_seconds' column
-    df['Duration'] = df['Duration_in_seconds'].apply(convert_duration)
-
-    # Drop the 'Duration_in_seconds' column as it is no longer needed
-    df = df.drop(columns=['Duration_in_seconds'])
-
-    # Return the final dataframe with 'Site Alias', 'Zone', 'Cluster', and the 'Duration'
-    return df[['Site Alias', 'Zone', 'Cluster', 'Duration']]
+    return pivot, pivot_totals(pivot)
 
+# Function to create pivot table for a specific alarm
+def create_pivot_table(df, alarm_name, edges=DURATION_BUCKET_EDGES):
+    return pivot_from_cube(build_alarm_cube(df[df['Alarm Name'] == alarm_name], edges), alarm_name, edges)
 
-# Function to convert multiple DataFrames to Excel with separate sheets
-def to_excel(dfs_dict):
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        for sheet_name, df in dfs_dict.items():
-            valid_sheet_name = re.sub(r'[\\/*?:[\]]', '_', sheet_name)[:31]
-            df.to_excel(writer, sheet_name=valid_sheet_name, index=False)
-    return output.getvalue()
+import pandas as pd
 
+# Function to count offline sites per Cluster/Zone for each duration class
+@instrument
+def offline_counts(df, hours=OFFLINE_DURATION_HOURS):
+    df = df.drop_duplicates()
+    
+    # Create new columns for each duration category
+    duration_cols = offline_duration_labels(hours)
+    df = pd.concat([df[['Cluster', 'Zone', 'Site Alias']], classify_offline_durations(df['Duration'], hours)], axis=1)
+    
+    counts = df.groupby(['Cluster', 'Zone'], observed=True).agg(
+        {**{col: 'sum' for col in duration_cols}, 'Site Alias': 'nunique'}
+    )
+    return counts.rename(columns={'Site Alias': 'Total'})
 
+# Function to create pivot table for offline report from its Cluster/Zone counts
+@instrument
+def offline_pivot_from_counts(counts):
+    pivot = counts.reset_index().astype({col: 'int64' for col in counts.columns})
+    return pivot, pivot_totals(pivot)
 
-# Function to convert multiple DataFrames to Excel with separate sheets
+# Function to create pivot table for offline report
+def create_offline_pivot(df, hours=OFFLINE_DURATION_HOURS):
+    return offline_pivot_from_counts(offline_counts(df, hours))
+
+# Function to sum the count columns of a typed pivot into its totals vector
+def pivot_totals(pivot):
+    return pivot.drop(columns=['Cluster', 'Zone']).sum().astype('int64')
+
+# Function to slice the rows of one Cluster out of a typed pivot, whose rows are grouped by Cluster
+def pivot_cluster_rows(pivot, cluster):
+    positions = np.flatnonzero(pivot['Cluster'].to_numpy(dtype=object) == cluster)
+    if len(positions) == 0:
+        return pivot.iloc[:0]
+    return pivot.iloc[positions[0]:positions[-1] + 1]
+
+# Function to lay out a typed pivot for display and export: repeated Cluster names blanked and the Total row appended
+def format_pivot(pivot, totals):
+    clusters = pivot['Cluster'].to_numpy(dtype=object)
+    repeated = np.zeros(len(clusters), dtype=bool)
+    repeated[1:] = clusters[1:] == clusters[:-1]
+
+    labels = pd.DataFrame({
+        'Cluster': np.append(np.where(repeated, '', clusters), 'Total'),
+        'Zone': np.append(pivot['Zone'].to_numpy(dtype=object), ''),
+    })
+    counts = np.vstack([pivot[totals.index].to_numpy(dtype=np.int64), totals.to_numpy()[np.newaxis, :]])
+    return pd.concat([labels, pd.DataFrame(counts, columns=totals.index)], axis=1)
+
+# Function to hash each alarm row on the given columns, numbering repeats so equal rows stay distinct
+def alarm_row_keys(df, columns=ALARM_DELTA_KEY):
+    hashes = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+    occurrence = pd.Series(hashes).groupby(hashes).cumcount().to_numpy()
+    return pd.util.hash_pandas_object(pd.DataFrame({'hash': hashes, 'occurrence': occurrence}), index=False).to_numpy()
+
+# Function to compare an alarm report with the previous one: new, cleared and still active alarms,
+# plus the rows the count cube has to add and remove
+@instrument
+def alarm_report_delta(previous_df, current_df):
+    previous_keys = alarm_row_keys(previous_df)
+    current_keys = alarm_row_keys(current_df)
+    is_new = ~np.isin(current_keys, previous_keys)
+    is_cleared = ~np.isin(previous_keys, current_keys)
+
+    # A still active alarm whose counted columns changed (e.g. its Duration Slot grew into the next bucket)
+    # leaves the cube with its old values and enters it with the new ones
+    previous_rows = alarm_row_keys(previous_df, ALARM_REQUIRED_COLUMNS)
+    current_rows = alarm_row_keys(current_df, ALARM_REQUIRED_COLUMNS)
+    return {
+        'new': current_df[is_new],
+        'cleared': previous_df[is_cleared],
+        'persisting': current_df[~is_new],
+        'added': current_df[~np.isin(current_rows, previous_rows)],
+        'removed': previous_df[~np.isin(previous_rows, current_rows)],
+    }
+
+# Function to update a count cube with the cubes of the added and removed rows
+@instrument
+def apply_cube_delta(cube, added_cube, removed_cube):
+    cube = pd.concat([cube, added_cube, -removed_cube]).groupby(level=list(cube.index.names), observed=True).sum()
+    return cube[cube != 0]
+
+# Function to find the latest alarm snapshot taken before a report, other than the report itself
+def previous_alarm_snapshot(report_time, source_hash, snapshot_dir=SNAPSHOT_DIR):
+    current_time = report_timestamp(report_time, datetime.now())
+    earlier = [
+        entry for entry in load_snapshot_index(snapshot_dir)
+        if entry['kind'] == 'alarm' and entry['sha256'] != source_hash
+        and report_timestamp(entry['report_time'], entry['saved_at']) < current_time
+    ]
+    if not earlier:
+        return None
+    return max(earlier, key=lambda entry: report_timestamp(entry['report_time'], entry['saved_at']))
+
+# Function to normalize Site Alias values for matching across reports (trimmed, single-spaced, upper case),
+# working on the distinct values only
+def normalize_site_alias(site_alias):
+    codes, uniques = pd.factorize(site_alias)
+    keys = pd.Series(np.asarray(uniques, dtype=object), dtype=object).astype(str)
+    keys = keys.str.strip().str.replace(r'\s+', ' ', regex=True).str.upper().to_numpy(dtype=object)
+    # Missing Site Alias values (code -1) pick up the trailing None
+    return np.append(keys, None)[codes]
+
+# Function to join the alarm and offline reports on normalized Site Alias through a hash index of the offline sites.
+# Returns one record per offline site with matching alarms and the typed Cluster/Zone pivot of those sites.
+@instrument
+def join_alarm_offline(alarm_df, offline_df, alarm_names=None):
+    # One record per offline site: the first row of a repeated site
+    offline_keys = pd.Series(normalize_site_alias(offline_df['Site Alias']))
+    first = (offline_keys.notna() & ~offline_keys.duplicated()).to_numpy()
+    sites = offline_df.loc[first, ['Site Alias', 'Cluster', 'Zone', 'Last Online Time', 'Duration']].reset_index(drop=True)
+    sites = sites.rename(columns={'Duration': 'Offline Duration'})
+    site_index = pd.Index(offline_keys[first].to_numpy())
+
+    # Each alarm row finds its offline site with one hash lookup
+    if alarm_names:
+        alarm_df = alarm_df[alarm_df['Alarm Name'].isin(alarm_names)]
+    positions = site_index.get_indexer(normalize_site_alias(alarm_df['Site Alias']))
+    matched = positions >= 0
+    alarms = pd.DataFrame({
+        'site': positions[matched],
+        'Alarm Name': alarm_df['Alarm Name'].astype(object).to_numpy()[matched],
+        'Alarm Time': alarm_df['Alarm Time'].to_numpy()[matched],
+        'Duration Slot (Hours)': pd.to_numeric(alarm_df['Duration Slot (Hours)'], errors='coerce').to_numpy()[matched],
+    })
+
+    # Per-site alarm summary and counts per alarm
+    names = order_alarm_names(sorted(alarms['Alarm Name'].dropna().unique().tolist()))
+    summary = alarms.groupby('site').agg(**{
+        'Alarms': ('Alarm Name', 'size'),
+        'First Alarm Time': ('Alarm Time', 'min'),
+        'Longest Alarm (Hours)': ('Duration Slot (Hours)', 'max'),
+    })
+    by_name = alarms.groupby(['site', 'Alarm Name']).size().unstack(fill_value=0).reindex(
+        index=summary.index, columns=names, fill_value=0
+    )
+    records = pd.concat([
+        sites.iloc[summary.index.to_numpy()].reset_index(drop=True),
+        summary.reset_index(drop=True),
+        by_name.reset_index(drop=True).astype('int64'),
+    ], axis=1)
+    records = records.sort_values(['Cluster', 'Zone', 'Site Alias'], ignore_index=True)
+
+    # Sites per Cluster/Zone, in total and with each alarm
+    count_cols = ['Total'] + names
+    flags = (records[names] > 0).astype('int64')
+    flags.insert(0, 'Total', 1)
+    counts = flags.groupby([records['Cluster'], records['Zone']], observed=True).sum()
+    pivot = counts.reset_index()[['Cluster', 'Zone'] + count_cols].astype({col: 'int64' for col in count_cols})
+    return records, pivot, pivot_totals(pivot)
+
+# Function to build the alarm filter index: row positions per Alarm Name and (Alarm Name, Cluster), sorted by Alarm Time
+@instrument
+def build_alarm_index(df):
+    times = pd.to_datetime(df['Alarm Time'], format=DATETIME_FORMATS['Alarm Time'], errors='coerce').to_numpy()
+
+    # Sort once by Alarm Time (NaT last) and keep only rows with client information
+    order = np.argsort(times, kind='stable')
+    order = order[df['Client'].notna().to_numpy()[order]]
+    keys = df[['Alarm Name', 'Cluster']].iloc[order]
+
+    by_alarm = {
+        name: order[pos] for name, pos in keys.groupby('Alarm Name', observed=True).indices.items()
+    }
+    by_cluster = {
+        key: order[pos] for key, pos in keys.groupby(['Alarm Name', 'Cluster'], observed=True).indices.items()
+    }
+    return times, by_alarm, by_cluster
+
+# Function to look up the time-sorted row positions of an alarm, optionally within one cluster
+def alarm_index_positions(alarm_index, alarm_name, cluster="All"):
+    _, by_alarm, by_cluster = alarm_index
+    if cluster == "All":
+        positions = by_alarm.get(alarm_name)
+    else:
+        positions = by_cluster.get((alarm_name, cluster))
+    return positions if positions is not None else np.empty(0, dtype=np.intp)
+
+# Function to get the first and last Alarm Time dates of indexed positions
+def alarm_date_bounds(alarm_index, positions):
+    times = alarm_index[0][positions]
+    times = times[~np.isnat(times)]
+    if len(times) == 0:
+        return None, None
+    return pd.Timestamp(times[0]).date(), pd.Timestamp(times[-1]).date()
+
+# Function to narrow indexed positions to a date range with a binary search
+def slice_alarm_dates(alarm_index, positions, start_date, end_date):
+    times = alarm_index[0][positions]
+    lo = np.searchsorted(times, np.datetime64(start_date), side='left')
+    hi = np.searchsorted(times, np.datetime64(end_date + timedelta(days=1)), side='left')
+    return positions[lo:hi]
+
+# Function to format hours offline as text: whole minutes below an hour, whole hours below a day, else whole days
+def offline_duration_text(hours):
+    hours = np.asarray(hours, dtype=float)
+    values = np.select([hours < 1, hours < 24], [hours * 60, hours], hours // 24)
+    units = np.select([hours < 1, hours < 24], [' minutes', ' hours'], ' days')
+    return pd.Series(np.trunc(values).astype(np.int64)).astype(str).to_numpy(dtype=object) + units
+
+# Function to pick the clock offline durations are measured against: the report's own timestamp, or now without one
+def offline_reference_time(report_time):
+    return report_timestamp(report_time, pd.Timestamp.now().floor('s'))
+
+# Function to calculate time offline smartly (minutes, hours, or days) at a reference time and keep the sites
+# offline for more than 1 day; the input frame is left unchanged
+@instrument
+def calculate_duration(df, reference_time):
+    last_online = pd.to_datetime(df['Last Online Time'], format='%Y-%m-%d %H:%M:%S')
+    hours_offline = ((pd.Timestamp(reference_time) - last_online).dt.total_seconds() / 3600).to_numpy()
+
+    # Filter rows where duration is more than 1 day
+    long_offline = hours_offline > 24
+    result = df.loc[long_offline, ['Site Alias', 'Cluster', 'Zone']].assign(**{
+        'Last Online Time': last_online[long_offline],
+    })
+    result.insert(0, 'Offline Duration', offline_duration_text(hours_offline[long_offline]))
+    return result
+
+# Function to convert multiple DataFrames to Excel with separate sheets, written row by row in constant memory
+@instrument
 def to_excel(dfs_dict):
     output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        for sheet_name, df in dfs_dict.items():
-            valid_sheet_name = re.sub(r'[\\/*?:[\]]', '_', sheet_name)[:31]
-            df.to_excel(writer, sheet_name=valid_sheet_name, index=False)
+    workbook = xlsxwriter.Workbook(output, {
+        'constant_memory': True,
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+    })
+    header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center'})
+    total_format = workbook.add_format({'bg_color': '#f0f0f0', 'font_color': 'black', 'bold': True})
+
+    for sheet_name, df in dfs_dict.items():
+        valid_sheet_name = re.sub(r'[\\/*?:[\]]', '_', sheet_name)[:31]
+        with timed_stage(f"to_excel:{valid_sheet_name}", len(df)):
+            worksheet = workbook.add_worksheet(valid_sheet_name)
+            worksheet.write_row(0, 0, [str(col) for col in df.columns], header_format)
+
+            # Pivot tables end with a 'Total' row in the Cluster column; repeated Clusters are already blank
+            is_total = df['Cluster'].eq('Total').to_numpy() if 'Cluster' in df.columns else np.zeros(len(df), dtype=bool)
+            for i, row in enumerate(df.astype(object).itertuples(index=False, name=None)):
+                row_format = total_format if is_total[i] else None
+                for j, value in enumerate(row):
+                    if pd.isna(value):
+                        if row_format is not None:
+                            worksheet.write_blank(i + 1, j, None, row_format)
+                        continue
+                    worksheet.write(i + 1, j, value, row_format)
+
+    workbook.close()
     return output.getvalue()
 
-# Function to create site-wise log table
+# Function to create site-wise log table with its page index (newest alarms first)
+@instrument
 def create_site_wise_log(df, selected_alarm):
     if selected_alarm == "All":
-        filtered_df = df.copy()
+        filtered_df = df
     else:
-        filtered_df = df[df['Alarm Name'] == selected_alarm].copy()
-    filtered_df = filtered_df[['Site Alias', 'Cluster', 'Zone', 'Alarm Name', 'Alarm Time','Duration']]
-    filtered_df = filtered_df.sort_values(by='Alarm Time', ascending=False)
-    return filtered_df
-
+        filtered_df = df[df['Alarm Name'] == selected_alarm]
+    filtered_df = filtered_df[SITE_WISE_LOG_COLUMNS]
+    return filtered_df, build_log_index(filtered_df, 'Alarm Time')
+
+# Function to build the page index of a log: row positions newest first by a datetime column (NaT last),
+# or in file order, plus each row's code into the distinct lowercased Site Aliases for search
+@instrument
+def build_log_index(df, time_column=None):
+    if time_column is None:
+        order = np.arange(len(df))
+    else:
+        times = pd.to_datetime(df[time_column], format=DATETIME_FORMATS.get(time_column), errors='coerce').to_numpy()
+        order = np.argsort(times, kind='stable')
+        valid = ~np.isnat(times[order])
+        order = np.concatenate([order[valid][::-1], order[~valid]])
+    codes, aliases = pd.factorize(df['Site Alias'])
+    aliases = pd.Series(np.asarray(aliases, dtype=object)).astype(str).str.lower()
+    return order, codes, aliases
+
+# Function to select the indexed rows whose Site Alias contains a search text, keeping the sort order.
+# Only the distinct aliases are matched, rows pick up the result through their alias code.
+def search_log_rows(log_index, text):
+    order, codes, aliases = log_index
+    text = (text or '').strip().lower()
+    if not text:
+        return order
+    # The extra False entry is picked up by rows without a Site Alias (code -1)
+    hit = np.append(aliases.str.contains(text, regex=False).to_numpy(dtype=bool), False)
+    return order[hit[codes[order]]]
+
+# Function to slice one page out of a log's row positions, clamping the page number into range
+def log_page(positions, page, page_size):
+    pages = max(1, -(-len(positions) // page_size))
+    page = min(max(int(page), 1), pages)
+    return positions[(page - 1) * page_size:page * page_size], pages
+
+@instrument
 def style_dataframe(df, duration_cols, is_dark_mode):
-    # Create a copy for styling
-    df_style = df.copy()
-    
-    # Identify the total row based on 'Cluster' column
-    total_row_mask = df_style['Cluster'] == 'Total'
-    
+    # Large frames are shown unstyled, rendering a Styler over them costs more than building them
+    if len(df) > STYLE_MAX_ROWS:
+        return df
+
     # Define background colors
     cell_bg_color = '#f0f0f0'
     font_color = 'black' if not is_dark_mode else 'black'
-    
-    # Create a Styler object
-    styler = df_style.style
-    
-    # Apply background color to cells with non zero 
-    def highlight_zero(val):
-        if val != 0:
-            return f'background-color: {cell_bg_color}; color: {font_color}'
-        return ''
-    
-    styler = styler.applymap(highlight_zero)
-    
-    # Handle total row: set all cells to empty except 'Cluster' and 'Zone' if needed
+    highlight = f'background-color: {cell_bg_color}; color: {font_color}'
+
+    # Identify the total row based on 'Cluster' column
+    total_row_mask = (df['Cluster'] == 'Total').to_numpy()
+
+    # Build the whole style frame at once: non zero cells, the total row and, when a total
+    # row exists, the 'Cluster' and 'Zone' columns are highlighted
+    mask = df.ne(0).to_numpy()
     if total_row_mask.any():
-        styler = styler.apply(
-            lambda x: ['background-color: #f0f0f0; color: black' if total_row_mask.loc[x.name] else '' for _ in x],
-            axis=1
-        )
-        # Optionally, you can set the 'Cluster' and 'Zone' cells to have a different style
-        styler = styler.applymap(
-            lambda x: f'background-color: {cell_bg_color}; color: {font_color}',
-            subset=['Cluster', 'Zone']
-        )
-    
+        mask[total_row_mask, :] = True
+        mask[:, df.columns.isin(['Cluster', 'Zone'])] = True
+    styles = pd.DataFrame(np.where(mask, highlight, ''), index=df.index, columns=df.columns)
+
+    styler = df.style.apply(lambda _: styles, axis=None)
+
     # Optional: Remove borders for a cleaner look
     styler.set_table_styles(
         [{
@@ -307,272 +665,1450 @@ def is_dark_mode():
         theme = 'light'
     return theme.lower() == 'dark'
 
-# Function to extract time from the first row and first column of the uploaded file
-def extract_time_from_file(uploaded_file):
-    try:
-        # Read the file without specifying header (so the first row is treated as data)
-        df = pd.read_excel(uploaded_file, header=None)
+# Function to hash uploaded bytes so identical uploads share one cache entry
+def hash_upload(data):
+    return hashlib.sha256(data).hexdigest()
+
+# Function to apply a report schema's types and derive the categorical helper columns
+def apply_schema(df, schema):
+    for col, kind in schema.items():
+        if col not in df.columns:
+            continue
+        if kind == 'category':
+            df[col] = df[col].astype('category')
+        elif kind == 'float':
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+        elif kind == 'datetime':
+            df[col] = pd.to_datetime(df[col], format=DATETIME_FORMATS.get(col), errors='coerce')
+
+    # Alarm reports also carry the client and the RMS Station prefix as categoricals
+    if 'Alarm Name' in df.columns:
+        if 'Site Alias' in df.columns:
+            df['Client'] = extract_clients(df['Site Alias'])
+        if 'RMS Station' in df.columns:
+            df['RMS Prefix'] = df['RMS Station'].astype(str).str[:1].astype('category')
+    return df
+
+# Function to open a report workbook read-only: timestamp from row 2, headers on row 3, then projected data rows
+def open_report(data, schema=None):
+    workbook = load_workbook(BytesIO(data), read_only=True, data_only=True)
+    sheet = workbook.worksheets[0]
+    preamble = list(sheet.iter_rows(min_row=1, max_row=3, values_only=True))
+    preamble += [()] * (3 - len(preamble))
+
+    # Extract the time value from the second row and first column
+    report_time = str(preamble[1][0]) if preamble[1] else str(None)
+
+    # Use the third row as header, mirroring pd.read_excel(header=2)
+    header = [
+        f"Unnamed: {i}" if name is None else str(name)
+        for i, name in enumerate(preamble[2])
+    ]
+
+    # Only the schema's columns are kept from each row
+    positions = {}
+    for i, name in enumerate(header):
+        if (schema is None or name in schema) and name not in positions:
+            positions[name] = i
+    columns = list(positions)
+    indices = list(positions.values())
+
+    def rows():
+        try:
+            if not indices:
+                return
+            project = itemgetter(*indices)
+            for row in sheet.iter_rows(min_row=4, max_col=max(indices) + 1, values_only=True):
+                values = project(row) if len(indices) > 1 else (project(row),)
+                if any(value is not None for value in values):
+                    yield values
+        finally:
+            workbook.close()
+
+    return report_time, columns, rows()
+
+# Function to tell the format of report bytes from their first bytes (XLSX is a zip archive, Parquet starts with PAR1)
+def report_format(data):
+    if data[:4] == b'PK\x03\x04':
+        return 'xlsx'
+    if data[:4] == b'PAR1':
+        return 'parquet'
+    return 'csv'
+
+# Function to read the timestamp (row 2) and the headers (row 3) of a CSV report
+def csv_preamble(data):
+    preamble = list(islice(csv.reader(StringIO(data[:CSV_PREAMBLE_BYTES].decode('utf-8-sig', errors='replace'))), 3))
+    preamble += [[]] * (3 - len(preamble))
+
+    # Extract the time value from the second row and first column
+    report_time = str(preamble[1][0] or None) if preamble[1] else str(None)
+
+    # Use the third row as header; a repeated name keeps its first column, like the workbook reader
+    header = []
+    for i, name in enumerate(preamble[2]):
+        name = name or f"Unnamed: {i}"
+        header.append(name if name not in header else f"{name}.{i}")
+    return report_time, header
+
+# Function to read the timestamp and the schema columns of a report without reading its rows
+def report_header(data, schema=None):
+    file_format = report_format(data)
+    if file_format == 'xlsx':
+        report_time, columns, _ = open_report(data, schema)
+        return report_time, columns
+    if file_format == 'parquet':
+        parquet_schema = pq.read_schema(pa.BufferReader(data))
+        metadata = parquet_schema.metadata or {}
+        if b'statusmatrix' in metadata:
+            # Snapshots of this app can be ingested again
+            report_time = str(json.loads(metadata[b'statusmatrix'])['report_time'])
+        else:
+            report_time = metadata.get(b'report_time', b'None').decode()
+        return report_time, [name for name in dict.fromkeys(parquet_schema.names) if schema is None or name in schema]
+    report_time, header = csv_preamble(data)
+    return report_time, [name for name in header if schema is None or name in schema]
+
+# Function to read a CSV or Parquet report into an Arrow table with the workbook conventions.
+# A CSV export keeps the workbook layout (timestamp in row 2, headers on row 3) and is parsed by Arrow's
+# multithreaded reader; a Parquet copy carries its headers as columns and the timestamp in its metadata.
+def read_report_table(data, schema=None):
+    if report_format(data) == 'parquet':
+        report_time, columns = report_header(data, schema)
+        return report_time, columns, pq.read_table(pa.BufferReader(data), columns=columns, use_threads=True)
+
+    report_time, header = csv_preamble(data)
+    columns = [name for name in header if schema is None or name in schema]
+    if not columns:
+        return report_time, columns, pa.table({})
+
+    read_options, convert_options = csv_report_options(header, columns, schema)
+    return report_time, columns, pa_csv.read_csv(
+        pa.BufferReader(data), read_options=read_options, convert_options=convert_options
+    )
 
-        # Extract the time value from the first row and first column
-        extracted_time = df.iloc[1, 0]  # Row 0, Column 0
+# Function to build the Arrow options that read the rows of a CSV report below its timestamp and header rows
+def csv_report_options(header, columns, schema=None):
+    # Cells stay text for the schema to convert (type inference only sees the first block of a stream),
+    # and only empty cells are missing, as in the workbook
+    column_types = {col: pa.string() for col in columns if schema is not None}
+    read_options = pa_csv.ReadOptions(use_threads=True, skip_rows=3, column_names=header)
+    convert_options = pa_csv.ConvertOptions(
+        include_columns=columns,
+        column_types=column_types,
+        null_values=[''],
+        strings_can_be_null=True,
+        quoted_strings_can_be_null=True,
+    )
+    return read_options, convert_options
+
+# Function to open the rows of a CSV or Parquet report as a stream of Arrow record batches
+def open_report_batches(data, schema=None, batch_rows=STREAM_CHUNK_ROWS):
+    if report_format(data) == 'parquet':
+        report_time, columns = report_header(data, schema)
+        if not columns:
+            return report_time, columns, iter(())
+        parquet_file = pq.ParquetFile(pa.BufferReader(data))
+        return report_time, columns, parquet_file.iter_batches(batch_size=batch_rows, columns=columns)
+
+    report_time, header = csv_preamble(data)
+    columns = [name for name in header if schema is None or name in schema]
+    if not columns:
+        return report_time, columns, iter(())
+    read_options, convert_options = csv_report_options(header, columns, schema)
+    return report_time, columns, pa_csv.open_csv(
+        pa.BufferReader(data), read_options=read_options, convert_options=convert_options
+    )
 
-        # Return the extracted value as a string (no need for datetime conversion)
-        return str(extracted_time)
-    except Exception as e:
-        st.error(f"Error extracting time from the file: {e}")
+# Function to regroup a stream of record batches into tables of a fixed number of rows (the last may be shorter)
+def rechunk_batches(batches, chunk_rows):
+    pending, pending_rows = [], 0
+    for batch in batches:
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        while pending_rows >= chunk_rows:
+            table = pa.Table.from_batches(pending)
+            yield table.slice(0, chunk_rows)
+            rest = table.slice(chunk_rows)
+            pending, pending_rows = rest.to_batches(), rest.num_rows
+    if pending_rows:
+        yield pa.Table.from_batches(pending)
+
+# Function to convert a report table to a frame like the workbook reader builds: only rows holding a value,
+# numbered by position
+def report_table_frame(table, columns):
+    if not columns:
+        return pd.DataFrame(columns=columns)
+    df = table.to_pandas()
+    return df[df.notna().any(axis=1)].reset_index(drop=True)
+
+# Function to parse a report (XLSX, CSV or Parquet) in a single read into one frame
+@instrument
+def parse_report(data, schema=None):
+    if report_format(data) == 'xlsx':
+        report_time, columns, rows = open_report(data, schema)
+        df = pd.DataFrame.from_records(list(rows), columns=columns).infer_objects()
+    else:
+        report_time, columns, table = read_report_table(data, schema)
+        df = report_table_frame(table, columns)
+    if schema is not None:
+        df = apply_schema(df, schema)
+
+    return df, report_time
+
+# Function to stream a report as fixed-size frames, keeping row positions in the index.
+# Workbooks are read row by row and CSV and Parquet batch by batch, so only one chunk of rows is held at a time.
+def iter_report_chunks(data, schema=None, chunk_rows=STREAM_CHUNK_ROWS):
+    if report_format(data) != 'xlsx':
+        report_time, columns, batches = open_report_batches(data, schema, chunk_rows)
+
+        def chunks():
+            start = 0
+            for table in rechunk_batches(batches, chunk_rows):
+                df = report_table_frame(table, columns)
+                if df.empty:
+                    continue
+                df.index = pd.RangeIndex(start, start + len(df))
+                start += len(df)
+                yield apply_schema(df, schema) if schema is not None else df
+
+        return report_time, columns, chunks()
+
+    report_time, columns, rows = open_report(data, schema)
+
+    def chunks():
+        start = 0
+        while True:
+            records = list(islice(rows, chunk_rows))
+            if not records:
+                break
+            df = pd.DataFrame.from_records(records, columns=columns).infer_objects()
+            df.index = pd.RangeIndex(start, start + len(df))
+            start += len(df)
+            yield apply_schema(df, schema) if schema is not None else df
+
+    return report_time, columns, chunks()
+
+# Function to build the file name of a report snapshot from its kind, report timestamp and content
+def snapshot_file_name(kind, report_time, source_hash):
+    slug = re.sub(r'[^0-9A-Za-z]+', '-', report_time).strip('-')
+    # Reports of different regions can share a timestamp, so the content hash tells them apart
+    return f"{kind}_{slug}_{source_hash[:8]}.parquet"
+
+# Function to convert a parsed report frame to an Arrow table holding only the schema's columns
+def snapshot_table(df, schema):
+    columns = [col for col in schema if col in df.columns]
+    frame = {}
+    for col in columns:
+        values = df[col]
+        if schema[col] in ('object', 'category'):
+            # Text columns are stored as strings so every chunk shares one Arrow schema
+            values = values.astype(object)
+            values = values.where(values.isna(), values.astype(str))
+        frame[col] = values
+    arrow_schema = pa.schema([(col, SNAPSHOT_ARROW_TYPES[schema[col]]) for col in columns])
+    return pa.Table.from_pandas(pd.DataFrame(frame, index=df.index), schema=arrow_schema, preserve_index=False)
+
+# Function to read the snapshot index of a snapshot directory, adding snapshots the index missed
+def load_snapshot_index(snapshot_dir=SNAPSHOT_DIR):
+    try:
+        with open(os.path.join(snapshot_dir, SNAPSHOT_INDEX_FILE)) as f:
+            entries = json.load(f)
+    except FileNotFoundError:
+        entries = []
+
+    # Concurrent writers can lose each other's index updates; each snapshot also carries its own entry
+    listed = {entry['file'] for entry in entries}
+    if os.path.isdir(snapshot_dir):
+        for file_name in sorted(os.listdir(snapshot_dir)):
+            if file_name.endswith('.parquet') and file_name not in listed:
+                metadata = pq.read_metadata(os.path.join(snapshot_dir, file_name))
+                if not metadata.metadata or b'statusmatrix' not in metadata.metadata:
+                    continue
+                entry = json.loads(metadata.metadata[b'statusmatrix'])
+                entry.update(file=file_name, rows=metadata.num_rows, columns=list(metadata.schema.names))
+                entries.append(entry)
+    return sorted(entries, key=itemgetter('saved_at'))
+
+# Function to add a snapshot to the index, replacing an earlier snapshot of the same file
+def record_snapshot(entry, snapshot_dir=SNAPSHOT_DIR):
+    entries = [e for e in load_snapshot_index(snapshot_dir) if e['file'] != entry['file']] + [entry]
+    path = os.path.join(snapshot_dir, SNAPSHOT_INDEX_FILE)
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(entries, f, indent=1)
+    os.replace(tmp_path, path)
+
+# Function to pass report chunks through while writing them to a snapshot; a failed write only logs a warning
+def snapshot_chunks(chunks, kind, report_time, source_hash, snapshot_dir=SNAPSHOT_DIR):
+    schema = REPORT_SCHEMAS[kind]
+    file_name = snapshot_file_name(kind, report_time, source_hash)
+    path = os.path.join(snapshot_dir, file_name)
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    entry = {
+        'kind': kind,
+        'report_time': report_time,
+        'sha256': source_hash,
+        'saved_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    writer, rows, failed, completed = None, 0, False, False
+    try:
+        for chunk in chunks:
+            if not failed:
+                try:
+                    table = snapshot_table(chunk, schema)
+                    if writer is None:
+                        os.makedirs(snapshot_dir, exist_ok=True)
+                        arrow_schema = table.schema.with_metadata({'statusmatrix': json.dumps(entry)})
+                        writer = pq.ParquetWriter(tmp_path, arrow_schema)
+                    writer.write_table(table)
+                    rows += len(chunk)
+                except (OSError, pa.ArrowException) as e:
+                    failed = True
+                    logger.warning(json.dumps({'event': 'snapshot_failed', **RUN_CONTEXT, 'file': file_name, 'error': str(e)}))
+            yield chunk
+        completed = True
+    finally:
+        if writer is not None:
+            writer.close()
+            if failed or not completed:
+                os.remove(tmp_path)
+
+    # Only a completely written snapshot replaces the previous one
+    if writer is not None and not failed:
+        os.replace(tmp_path, path)
+        record_snapshot({**entry, 'file': file_name, 'rows': rows, 'columns': list(table.schema.names)}, snapshot_dir)
+
+# Function to save a parsed report frame as a snapshot
+@instrument
+def save_snapshot(df, kind, report_time, source_hash, snapshot_dir=SNAPSHOT_DIR):
+    for _ in snapshot_chunks([df], kind, report_time, source_hash, snapshot_dir):
+        pass
+    return df
+
+# Function to reopen a report snapshot as a typed frame, memory-mapping the Parquet file
+# (the latest one saved for the timestamp, unless the content hash picks one)
+@instrument
+def load_snapshot(kind, report_time, snapshot_dir=SNAPSHOT_DIR, source_hash=None):
+    entries = [
+        e for e in load_snapshot_index(snapshot_dir)
+        if e['kind'] == kind and e['report_time'] == report_time and source_hash in (None, e['sha256'])
+    ]
+    if not entries:
+        raise ValueError(f"No {kind} report snapshot for '{report_time}' in {snapshot_dir}")
+    df = pd.read_parquet(os.path.join(snapshot_dir, entries[-1]['file']), memory_map=True)
+    return apply_schema(df, REPORT_SCHEMAS[kind]), report_time
+
+# Function to read the date out of a report's row 2 text (None when it holds no date in a known RMS format)
+def parse_report_time(report_time):
+    match = REPORT_TIME_PATTERN.search(str(report_time))
+    if match is None:
         return None
+    for fmt in REPORT_TIME_FORMATS:
+        try:
+            return pd.Timestamp(datetime.strptime(match.group(0), fmt))
+        except ValueError:
+            continue
+    return None
+
+# Function to read the date out of a report's row 2 text, falling back when it holds none
+def report_timestamp(report_time, fallback):
+    timestamp = parse_report_time(report_time)
+    return pd.Timestamp(fallback) if timestamp is None else timestamp
+
+# Function to turn an alarm count cube, or offline Cluster/Zone counts, into rollup rows with the same counts as the pivots
+def rollup_rows(counts, kind):
+    dimensions = ROLLUP_DIMENSIONS[kind]
+    if kind == 'alarm':
+        counts = counts.groupby(level=dimensions, observed=True).sum()
+    else:
+        counts = counts.rename_axis(columns='Duration Class').stack()
+
+    # Labels are stored as plain strings, each snapshot has its own categories
+    rows = counts.rename('Count').reset_index()
+    rows[dimensions] = rows[dimensions].astype(str)
+    rows['Count'] = rows['Count'].astype('int64')
+    return rows
+
+# Function to aggregate one report snapshot into rollup rows
+def snapshot_rollup(df, kind):
+    if kind == 'alarm' and all(col in df.columns for col in ALARM_REQUIRED_COLUMNS):
+        return rollup_rows(build_alarm_cube(df), kind)
+    if kind == 'offline' and all(col in df.columns for col in ['Cluster', 'Zone', 'Site Alias', 'Duration']):
+        return rollup_rows(offline_counts(df), kind)
+    return pd.DataFrame(columns=ROLLUP_DIMENSIONS[kind] + ['Count'])
+
+# Function to write the rollup rows of one snapshot as its own part file, so writers never share a file
+def write_rollup_part(rows, snapshot_file, report_time, fallback, snapshot_dir=SNAPSHOT_DIR):
+    rows = rows.copy()
+    rows.insert(0, 'Report Time', report_timestamp(report_time, fallback))
+    rows.insert(0, 'Snapshot', snapshot_file)
+    rows['Report Time'] = pd.to_datetime(rows['Report Time'])
+    rollup_dir = os.path.join(snapshot_dir, ROLLUP_DIR)
+    os.makedirs(rollup_dir, exist_ok=True)
+    path = os.path.join(rollup_dir, snapshot_file)
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    rows.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+# Function to add the rollup part of a just saved snapshot from the counts the pipeline already computed
+def save_rollup(counts, kind, report_time, source_hash, snapshot_dir=SNAPSHOT_DIR):
+    snapshot_file = snapshot_file_name(kind, report_time, source_hash)
+    if counts is None or not os.path.exists(os.path.join(snapshot_dir, snapshot_file)):
+        return
+    try:
+        write_rollup_part(rollup_rows(counts, kind), snapshot_file, report_time, datetime.now(), snapshot_dir)
+    except (OSError, ValueError, pa.ArrowException) as e:
+        # The trend view aggregates the snapshot itself when its part is missing
+        logger.warning(json.dumps({'event': 'rollup_failed', **RUN_CONTEXT, 'file': snapshot_file, 'error': str(e)}))
+
+# Function to read the rollup tables of the snapshot directory. Parts of removed snapshots are dropped, and
+# snapshots without a part (uploads whose counts were not computed at ingest) are aggregated once.
+@instrument
+def update_rollup(snapshot_dir=SNAPSHOT_DIR):
+    entries = load_snapshot_index(snapshot_dir)
+    rollup_dir = os.path.join(snapshot_dir, ROLLUP_DIR)
+    parts = set(os.listdir(rollup_dir)) if os.path.isdir(rollup_dir) else set()
+    current = {entry['file'] for entry in entries}
+    for file_name in parts - current:
+        if file_name.endswith('.parquet'):
+            try:
+                os.remove(os.path.join(rollup_dir, file_name))
+            except FileNotFoundError:
+                pass
+
+    rollups = {}
+    for kind in ROLLUP_DIMENSIONS:
+        frames = []
+        for entry in entries:
+            if entry['kind'] != kind:
+                continue
+            if entry['file'] not in parts:
+                df, _ = load_snapshot(kind, entry['report_time'], snapshot_dir, entry['sha256'])
+                write_rollup_part(snapshot_rollup(df, kind), entry['file'], entry['report_time'], entry['saved_at'], snapshot_dir)
+            frames.append(pd.read_parquet(os.path.join(rollup_dir, entry['file'])))
+
+        columns = ['Snapshot', 'Report Time'] + ROLLUP_DIMENSIONS[kind] + ['Count']
+        frames = [frame for frame in frames if not frame.empty]
+        rollup = pd.concat(frames, ignore_index=True)[columns] if frames else pd.DataFrame(columns=columns)
+        rollup['Report Time'] = pd.to_datetime(rollup['Report Time'])
+        rollup['Count'] = rollup['Count'].astype('int64')
+        rollups[kind] = rollup
+    return rollups['alarm'], rollups['offline']
+
+# Function to pivot rollup counts of the last TREND_DAYS days into one trend line per group
+def trend_lines(rollup, by, days=TREND_DAYS):
+    if rollup.empty:
+        return pd.DataFrame()
+    recent = rollup[rollup['Report Time'] >= rollup['Report Time'].max() - pd.Timedelta(days=days)]
+    return recent.pivot_table(index='Report Time', columns=by, values='Count', aggfunc='sum', fill_value=0)
+
+# Function to parse a report upload and keep a snapshot of it when a snapshot directory is set
+def ingest_report(data, kind, snapshot_dir=SNAPSHOT_DIR):
+    df, report_time = parse_report(data, REPORT_SCHEMAS[kind])
+    if snapshot_dir:
+        save_snapshot(df, kind, report_time, hash_upload(data), snapshot_dir)
+    return df, report_time
+
+# Function to stream a report's chunks, snapshotting them on the way when a snapshot directory is set
+def iter_ingested_chunks(data, kind, chunk_rows=STREAM_CHUNK_ROWS, snapshot_dir=None):
+    report_time, columns, chunks = iter_report_chunks(data, REPORT_SCHEMAS[kind], chunk_rows)
+    if snapshot_dir:
+        chunks = snapshot_chunks(chunks, kind, report_time, hash_upload(data), snapshot_dir)
+    return report_time, columns, chunks
+
+# Function to build an all-missing column of a schema type (NaT for datetimes, NaN for floats, None for text)
+def missing_column(kind, index):
+    if kind == 'datetime':
+        return pd.Series(pd.NaT, index=index, dtype='datetime64[ns]')
+    if kind == 'float':
+        return pd.Series(np.nan, index=index, dtype='float64')
+    return pd.Series(None, index=index, dtype=object)
+
+# Function to merge several uploads of one report into a single Parquet report with the latest report time.
+# Files are streamed chunk by chunk and a row whose key hash came from an earlier file is dropped, so only one
+# chunk, the key hashes and the compressed output are held at a time.
+@instrument
+def merge_reports(datas, kind, chunk_rows=STREAM_CHUNK_ROWS):
+    schema = REPORT_SCHEMAS[kind]
+    headers = [report_header(data, schema) for data in datas]
+    for i, (_, columns) in enumerate(headers):
+        if not columns:
+            raise ValueError(f"file {i + 1} has none of the report's columns")
+    present = {col for _, columns in headers for col in columns}
+    columns = [col for col in schema if col in present]
+    # Rows are matched only on key columns every file has; a file missing one would hash its rows with an empty
+    # value there, and they would never match the other files
+    shared = set.intersection(*(set(columns) for _, columns in headers))
+    key_columns = [col for col in MERGE_KEYS[kind] if col in shared]
+    if not key_columns:
+        raise ValueError(f"the files share none of the key columns {', '.join(MERGE_KEYS[kind])}")
+    report_time = max(
+        (report_time for report_time, _ in headers), key=lambda report_time: report_timestamp(report_time, pd.Timestamp.min)
+    )
 
-# Streamlit app
-st.title("StatusMatrix@STL")
-
-# File Uploads
-uploaded_alarm_file = st.file_uploader("Upload Current Alarms Report", type=["xlsx"])
-uploaded_offline_file = st.file_uploader("Upload Offline Report", type=["xlsx"])
-
-# Initialize Sidebar Filters
-st.sidebar.header("Filters")
-
-# Extract times from the uploaded files
-alarm_file_time = None
-offline_file_time = None
-
-if uploaded_alarm_file is not None:
-    alarm_file_time = extract_time_from_file(uploaded_alarm_file)
-
-if uploaded_offline_file is not None:
-    offline_file_time = extract_time_from_file(uploaded_offline_file)
-
-# Now alarm_file_time and offline_file_time are available for use but not displayed in the sidebar
-
-# Add checkbox for offline site log
-show_offline_site_log = st.sidebar.checkbox("Show Offline Site Log")
-#show_offline_site_log = st.markdown(f"{offline_file_time}")
+    arrow_schema = pa.schema([(col, SNAPSHOT_ARROW_TYPES[schema[col]]) for col in columns])
+    arrow_schema = arrow_schema.with_metadata({b'report_time': report_time.encode()})
+    output = BytesIO()
+    seen = np.empty(0, dtype=np.uint64)
+    with pq.ParquetWriter(output, arrow_schema) as writer:
+        for data in datas:
+            _, _, chunks = iter_report_chunks(data, schema, chunk_rows)
+            file_hashes = [seen[:0]]
+            for df in chunks:
+                # A column this file lacks is added empty with its schema type, so the chunk casts to the merged schema
+                df = df.assign(**{col: missing_column(schema[col], df.index) for col in columns if col not in df.columns})
+                df = df[columns]
+                hashes = pd.util.hash_pandas_object(df[key_columns], index=False).to_numpy()
+                file_hashes.append(hashes)
+                # Repeated keys within one file are all kept, as in a single upload
+                writer.write_table(snapshot_table(df[~np.isin(hashes, seen)], schema).cast(arrow_schema))
+            seen = np.union1d(seen, np.concatenate(file_hashes))
+    return output.getvalue()
 
-if uploaded_alarm_file is not None and uploaded_offline_file is not None:
-    try:
-        # Read Excel files starting from the third row (header=2)
-        alarm_df = pd.read_excel(uploaded_alarm_file, header=2)
-        offline_df = pd.read_excel(uploaded_offline_file, header=2)
-
-        # === Offline Site Log ===
-        if show_offline_site_log:
-            st.markdown("### Offline Site Log")
-            st.markdown(f"{offline_file_time}")
-            columns_to_display = ['Site', 'Site Alias', 'Zone', 'Cluster', 'Last Online Time', 'Duration']
-            
-            # Check if required columns exist in the offline file
-            if all(col in offline_df.columns for col in columns_to_display):
-                st.dataframe(offline_df[columns_to_display])
-            else:
-                missing_columns = [col for col in columns_to_display if col not in offline_df.columns]
-                st.error(f"Missing columns in the uploaded offline report: {', '.join(missing_columns)}")
-
-        # Other functionality (processing alarms, etc.) continues here...
-        # Make sure to include your other checks and features from the previous code
-            # Get unique clusters for filtering
-        offline_clusters = sorted(offline_df['Cluster'].dropna().unique().tolist())
-        offline_clusters.insert(0, "All")  # Add 'All' option
-        selected_offline_cluster = st.sidebar.selectbox(
-            "Select Cluster",
-            options=offline_clusters,
-            index=0
+# Function to aggregate a large alarm report chunk by chunk into the count cube
+@instrument
+def stream_alarm_report(data, edges=DURATION_BUCKET_EDGES, chunk_rows=STREAM_CHUNK_ROWS, snapshot_dir=None):
+    report_time, columns, chunks = iter_ingested_chunks(data, 'alarm', chunk_rows, snapshot_dir)
+    has_required = all(col in columns for col in ALARM_REQUIRED_COLUMNS)
+
+    cube = None
+    alarm_names = set()
+    for chunk in chunks:
+        if 'Alarm Name' in chunk.columns:
+            alarm_names.update(chunk['Alarm Name'].dropna().unique().tolist())
+        if not has_required:
+            continue
+        chunk_cube = build_alarm_cube(chunk, edges)
+        if cube is None:
+            cube = chunk_cube
+        else:
+            # Cube counts are additive across chunks
+            cube = pd.concat([cube, chunk_cube]).groupby(level=list(cube.index.names), observed=True).sum()
+
+    if snapshot_dir:
+        save_rollup(cube, 'alarm', report_time, hash_upload(data), snapshot_dir)
+    return cube, sorted(alarm_names), columns, report_time
+
+# Function to collect the rows of some alarms from a large alarm report in a single pass
+@instrument
+def stream_alarm_rows(data, alarm_names, chunk_rows=STREAM_CHUNK_ROWS):
+    report_time, columns, chunks = iter_report_chunks(data, REPORT_SCHEMAS['alarm'], chunk_rows)
+    selected = [chunk[chunk['Alarm Name'].isin(alarm_names)] for chunk in chunks]
+    if not selected:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(selected)
+
+# Function to aggregate a large offline report chunk by chunk: Cluster/Zone counts and long time offline sites
+@instrument
+def stream_offline_report(data, hours=OFFLINE_DURATION_HOURS, chunk_rows=STREAM_CHUNK_ROWS, snapshot_dir=None, reference_time=None):
+    report_time, columns, chunks = iter_ingested_chunks(data, 'offline', chunk_rows, snapshot_dir)
+    duration_cols = offline_duration_labels(hours)
+
+    seen = np.empty(0, dtype=np.uint64)
+    class_counts = []
+    sites = pd.DataFrame(columns=['Cluster', 'Zone', 'Site Alias'])
+    long_offline = []
+    if reference_time is None:
+        reference_time = offline_reference_time(report_time)
+    for chunk in chunks:
+        long_offline.append(calculate_duration(chunk, reference_time))
+
+        # Drop rows already seen in this or an earlier chunk, like drop_duplicates over the whole report
+        row_hash = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+        keep = ~(pd.Series(row_hash).duplicated().to_numpy() | np.isin(row_hash, seen))
+        seen = np.union1d(seen, row_hash[keep])
+        chunk = chunk[keep]
+
+        flags = classify_offline_durations(chunk['Duration'], hours)
+        class_counts.append(
+            pd.concat([chunk[['Cluster', 'Zone']].astype(object), flags], axis=1)
+            .groupby(['Cluster', 'Zone']).sum()
         )
+        # Distinct sites per Cluster/Zone, so Total stays a nunique count across chunks
+        sites = pd.concat([sites, chunk[['Cluster', 'Zone', 'Site Alias']].astype(object).dropna()]).drop_duplicates()
 
- # === Current Alarms Filters ===
-        st.sidebar.subheader("Current Alarms Filters")
-        st.sidebar.text("[select alarm first]")
-        # Get unique alarm names
+    if class_counts:
+        counts = pd.concat(class_counts).groupby(level=['Cluster', 'Zone']).sum()
+    else:
+        counts = pd.DataFrame(columns=duration_cols, index=pd.MultiIndex.from_arrays([[], []], names=['Cluster', 'Zone']))
+    counts['Total'] = sites.groupby(['Cluster', 'Zone']).size().reindex(counts.index, fill_value=0)
+    counts = counts.astype('int64')
+    if snapshot_dir:
+        save_rollup(counts, 'offline', report_time, hash_upload(data), snapshot_dir)
+
+    long_offline = pd.concat(long_offline) if long_offline else calculate_duration(pd.DataFrame(columns=columns), reference_time)
+    return counts, long_offline, columns, report_time
+
+# Function to run the report pipeline on one alarm/offline workbook pair without the Streamlit page
+@instrument
+def run_report_pipeline(alarm_data, offline_data, snapshot_dir=None):
+    # Current Alarms: one count cube, sliced into a pivot per alarm
+    if len(alarm_data) > STREAMING_THRESHOLD_BYTES:
+        alarm_cube, alarm_names, alarm_columns, alarm_file_time = stream_alarm_report(alarm_data, snapshot_dir=snapshot_dir)
+    else:
+        alarm_df, alarm_file_time = ingest_report(alarm_data, 'alarm', snapshot_dir)
+        alarm_columns = list(alarm_df.columns)
         alarm_names = sorted(alarm_df['Alarm Name'].dropna().unique().tolist())
-        alarm_names.insert(0, "All")  # Add 'All' option
-        selected_alarm = st.sidebar.selectbox(
-            "Select Alarm to Filter",
-            options=alarm_names,
-            index=0
+        alarm_cube = build_alarm_cube(alarm_df) if all(col in alarm_columns for col in ALARM_REQUIRED_COLUMNS) else None
+        if snapshot_dir:
+            save_rollup(alarm_cube, 'alarm', alarm_file_time, hash_upload(alarm_data), snapshot_dir)
+    if alarm_cube is None:
+        raise ValueError(f"The Alarm Report is missing one of the required columns: {ALARM_REQUIRED_COLUMNS}")
+    alarm_data = {name: pivot_from_cube(alarm_cube, name) for name in order_alarm_names(alarm_names)}
+
+    # Offline Report: Cluster/Zone pivot and long time offline sites
+    if len(offline_data) > STREAMING_THRESHOLD_BYTES:
+        offline_counts_df, offline_summary_df, offline_columns, offline_file_time = stream_offline_report(
+            offline_data, snapshot_dir=snapshot_dir
+        )
+        pivot_offline, offline_totals = offline_pivot_from_counts(offline_counts_df)
+    else:
+        offline_df, offline_file_time = ingest_report(offline_data, 'offline', snapshot_dir)
+        pivot_offline, offline_totals = create_offline_pivot(offline_df)
+        if snapshot_dir:
+            save_rollup(pivot_offline.set_index(['Cluster', 'Zone']), 'offline', offline_file_time, hash_upload(offline_data), snapshot_dir)
+        offline_summary_df = calculate_duration(offline_df, offline_reference_time(offline_file_time))
+
+    return {
+        'alarm_data': alarm_data,
+        'alarm_file_time': alarm_file_time,
+        'pivot_offline': pivot_offline,
+        'offline_totals': offline_totals,
+        'total_offline_count': int(offline_totals['Total']),
+        'offline_summary_df': offline_summary_df,
+        'offline_file_time': offline_file_time,
+    }
+
+# Function to build the Excel downloads of a pipeline result, keyed by their download file names
+def report_excel_files(result):
+    files = {"Offline_Summary.xlsx": to_excel({"Offline Summary": result['offline_summary_df']})}
+    if result['alarm_data']:
+        files["Current_Alarms_Report.xlsx"] = to_excel(
+            {alarm_name: format_pivot(*data) for alarm_name, data in result['alarm_data'].items()}
+        )
+    return files
+
+# Function to build the directory name of a precomputed report from its pair key and the content of both reports
+def precomputed_file_name(key, alarm_hash, offline_hash):
+    return f"{key}_{alarm_hash[:8]}_{offline_hash[:8]}"
+
+# Function to store a frame as plain Parquet: categoricals as their values, so no pandas type metadata is needed
+def write_plain_parquet(df, path):
+    plain = df.astype({col: object for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)})
+    plain.to_parquet(path, index=False)
+
+# Function to store a pipeline result as Parquet tables, a JSON manifest and its Excel downloads, so the page can
+# open it without recomputing
+@instrument
+def save_precomputed_report(key, result, file_name, precomputed_dir=PRECOMPUTED_DIR):
+    path = os.path.join(precomputed_dir, file_name)
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    os.makedirs(tmp_path)
+    try:
+        alarm_files = []
+        for i, (alarm_name, (pivot, _)) in enumerate(result['alarm_data'].items()):
+            alarm_files.append({'alarm_name': alarm_name, 'file': f"alarm_{i:03d}.parquet"})
+            write_plain_parquet(pivot, os.path.join(tmp_path, alarm_files[-1]['file']))
+        write_plain_parquet(result['pivot_offline'], os.path.join(tmp_path, 'pivot_offline.parquet'))
+        write_plain_parquet(result['offline_summary_df'], os.path.join(tmp_path, 'offline_summary.parquet'))
+        excel_files = report_excel_files(result)
+        for excel_name, content in excel_files.items():
+            with open(os.path.join(tmp_path, excel_name), 'wb') as f:
+                f.write(content)
+
+        manifest = {
+            'key': key,
+            'saved_at': datetime.now().isoformat(timespec='seconds'),
+            'alarm_file_time': result['alarm_file_time'],
+            'offline_file_time': result['offline_file_time'],
+            'alarms': alarm_files,
+            'excel_files': list(excel_files),
+        }
+        with open(os.path.join(tmp_path, PRECOMPUTED_MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=1)
+
+        # The page only ever sees complete reports; a report stored meanwhile by another worker is kept
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            if not os.path.exists(os.path.join(path, PRECOMPUTED_MANIFEST_FILE)):
+                raise
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    return path
+
+# Function to list the precomputed report directories of a directory, latest first
+def list_precomputed_reports(precomputed_dir=PRECOMPUTED_DIR):
+    if not precomputed_dir or not os.path.isdir(precomputed_dir):
+        return []
+    manifests = [
+        os.path.join(precomputed_dir, name, PRECOMPUTED_MANIFEST_FILE)
+        for name in os.listdir(precomputed_dir) if not name.endswith('.tmp')
+    ]
+    manifests = [manifest for manifest in manifests if os.path.isfile(manifest)]
+    return [os.path.dirname(manifest) for manifest in sorted(manifests, key=os.path.getmtime, reverse=True)]
+
+# Function to read a precomputed report back: its manifest, the typed pivots with their totals and the Excel downloads
+def read_precomputed_report(path):
+    with open(os.path.join(path, PRECOMPUTED_MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    alarm_data = {}
+    for alarm in manifest['alarms']:
+        pivot = pd.read_parquet(os.path.join(path, alarm['file']))
+        alarm_data[alarm['alarm_name']] = (pivot, pivot_totals(pivot))
+    pivot_offline = pd.read_parquet(os.path.join(path, 'pivot_offline.parquet'))
+    excel_files = {}
+    for excel_name in manifest['excel_files']:
+        with open(os.path.join(path, excel_name), 'rb') as f:
+            excel_files[excel_name] = f.read()
+    result = {
+        'alarm_data': alarm_data,
+        'alarm_file_time': manifest['alarm_file_time'],
+        'pivot_offline': pivot_offline,
+        'offline_totals': pivot_totals(pivot_offline),
+        'offline_summary_df': pd.read_parquet(os.path.join(path, 'offline_summary.parquet')),
+        'offline_file_time': manifest['offline_file_time'],
+    }
+    result['total_offline_count'] = int(result['offline_totals']['Total'])
+    return {'key': manifest['key'], 'saved_at': manifest['saved_at'], 'result': result, 'excel_files': excel_files}
+
+# Function to estimate the memory held by a cached result
+def cached_size(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(cached_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(cached_size(item) for item in value.values())
+    return sys.getsizeof(value)
+
+# Function to hold the parse cache shared by every session of this server process: LRU entries with their sizes,
+# hit/miss counters and the parses still running
+@st.cache_resource
+def shared_parse_cache():
+    return {
+        'entries': OrderedDict(),
+        'sizes': {},
+        'bytes': 0,
+        'hits': 0,
+        'misses': 0,
+        'evictions': 0,
+        'pending': {},
+        'lock': threading.Lock(),
+    }
+
+# Function to fetch a result from the shared LRU parse cache, computing it on a miss.
+# Keys are content hashes plus filter parameters, so sessions opening the same report share its entries.
+def cached_parse(key, compute):
+    cache = shared_parse_cache()
+    with cache['lock']:
+        if key in cache['entries']:
+            cache['entries'].move_to_end(key)
+            cache['hits'] += 1
+            return cache['entries'][key]
+        cache['misses'] += 1
+
+    result = compute()
+    size = cached_size(result)
+    with cache['lock']:
+        # A result larger than the whole ceiling is returned without being cached
+        if key not in cache['entries'] and size <= PARSE_CACHE_MAX_BYTES:
+            cache['entries'][key] = result
+            cache['sizes'][key] = size
+            cache['bytes'] += size
+            while cache['bytes'] > PARSE_CACHE_MAX_BYTES:
+                evicted, _ = cache['entries'].popitem(last=False)
+                cache['bytes'] -= cache['sizes'].pop(evicted)
+                cache['evictions'] += 1
+    return result
+
+# Function to summarise the shared parse cache for the Diagnostics panel
+def parse_cache_stats():
+    cache = shared_parse_cache()
+    with cache['lock']:
+        return {
+            'entries': len(cache['entries']),
+            'memory_mb': round(cache['bytes'] / 2 ** 20, 1),
+            'ceiling_mb': round(PARSE_CACHE_MAX_BYTES / 2 ** 20, 1),
+            'hits': cache['hits'],
+            'misses': cache['misses'],
+            'evictions': cache['evictions'],
+        }
+
+# Function to build the parse cache key and parse function of an upload (hashed once per rerun by the page):
+# one frame, or chunk aggregates when streamed
+def upload_parse_job(uploaded_file, upload_hash, kind, stream=False):
+    data = uploaded_file.getvalue()
+    if stream and kind == 'offline':
+        # The aggregates hold the long time offline sites, measured at a clock that is part of the key
+        reference_time = upload_reference_time(uploaded_file, upload_hash)
+        return (
+            ('offline-stream', upload_hash, reference_time),
+            lambda: stream_offline_report(data, snapshot_dir=SNAPSHOT_DIR, reference_time=reference_time)
+        )
+    if stream:
+        return ('alarm-stream', upload_hash), lambda: stream_alarm_report(data, snapshot_dir=SNAPSHOT_DIR)
+    return (kind, upload_hash), lambda: ingest_report(data, kind)
+
+# Function to resolve the clock an offline upload's durations are measured against: the report's own timestamp, or
+# the time this session first saw a report without one. Cached tables carry it in their key, so no session is shown
+# durations measured at another session's "now".
+def upload_reference_time(uploaded_file, upload_hash, report_time=None):
+    if report_time is None:
+        # Opening a large workbook for its row 2 text is slow, so it is read once per content
+        report_time = cached_parse(
+            ('report-time', 'offline', upload_hash),
+            lambda: report_header(uploaded_file.getvalue(), REPORT_SCHEMAS['offline'])[0]
+        )
+    reference_time = parse_report_time(report_time)
+    if reference_time is None:
+        first_seen = st.session_state.setdefault('upload_reference_times', {})
+        reference_time = first_seen.setdefault(upload_hash, pd.Timestamp.now().floor('s'))
+    return reference_time
+
+# Function to run parse jobs at the same time within a shared wall-clock budget, through the parse cache.
+# Returns the results and the errors by job name; a job still running at the deadline is picked up on the next run,
+# and sessions uploading the same file at the same time wait on one parse.
+def load_uploads(jobs, budget=PARSE_BUDGET_SECONDS):
+    cache = shared_parse_cache()
+
+    results, errors, futures = {}, {}, {}
+    executor = None
+    for name, (key, compute) in jobs.items():
+        with cache['lock']:
+            cached = key in cache['entries']
+            if not cached and key not in cache['pending']:
+                # Parse functions only touch their own bytes, so they can run outside the script thread
+                executor = executor or ThreadPoolExecutor(max_workers=len(jobs))
+                cache['pending'][key] = executor.submit(compute)
+            future = cache['pending'].get(key)
+        if cached:
+            results[name] = cached_parse(key, compute)
+        else:
+            futures[future] = (name, key)
+    if executor is not None:
+        executor.shutdown(wait=False)
+
+    done, not_done = wait(futures, timeout=budget)
+    for future in done:
+        name, key = futures[future]
+        with cache['lock']:
+            cache['pending'].pop(key, None)
+        try:
+            results[name] = cached_parse(key, future.result)
+        except Exception as e:
+            errors[name] = e
+    for future in not_done:
+        errors[futures[future][0]] = TimeoutError(f"still parsing after {budget} seconds, rerun the page to wait longer")
+    return results, errors
+
+# Function to combine the uploaded files of one report into a single upload with its content hash; several files
+# are merged once per set of contents through the parse cache, which keeps the merged report's hash with it
+def merge_uploads(uploaded_files, kind):
+    if not uploaded_files:
+        return None, None
+    datas = [uploaded_file.getvalue() for uploaded_file in uploaded_files]
+    hashes = [hash_upload(data) for data in datas]
+    if len(uploaded_files) == 1:
+        return uploaded_files[0], hashes[0]
+
+    def merge():
+        merged = merge_reports(datas, kind)
+        return merged, hash_upload(merged)
+    merged, upload_hash = cached_parse(('merged', kind) + tuple(hashes), merge)
+    return BytesIO(merged), upload_hash
+
+# Function to load an uploaded report through the session's LRU parse cache, snapshotting it on first parse
+def load_report(uploaded_file, upload_hash, kind):
+    return cached_parse(*upload_parse_job(uploaded_file, upload_hash, kind))
+
+# Function to load the cached alarm count cube of an upload
+def load_alarm_cube(upload_hash, alarm_df):
+    return cached_parse(('alarm-cube', upload_hash), lambda: build_alarm_cube(alarm_df))
+
+# Function to load the cached filter index of an upload (or of one alarm's streamed rows)
+def load_alarm_index(upload_hash, alarm_df, alarm_name=None):
+    key = ('alarm-index', alarm_name, upload_hash)
+    return cached_parse(key, lambda: build_alarm_index(alarm_df))
+
+# Function to load the cached site-wise log of one alarm with its page index (alarm_df None reads a large upload's rows)
+def load_site_wise_log(uploaded_file, upload_hash, alarm_df, alarm_name):
+    key = ('site-log', alarm_name, upload_hash)
+    if alarm_df is None:
+        return cached_parse(
+            key, lambda: create_site_wise_log(load_alarm_rows(uploaded_file, upload_hash, [alarm_name]), alarm_name)
         )
+    return cached_parse(key, lambda: create_site_wise_log(alarm_df, alarm_name))
+
+# Function to load the cached page index of an offline upload's site log (file order)
+def load_offline_log_index(upload_hash, offline_df):
+    key = ('offline-log', upload_hash)
+    return cached_parse(key, lambda: build_log_index(offline_df))
+
+# Function to show the Site Alias search and page controls of a log and return the rows of the visible page
+def log_page_controls(df, log_index, key):
+    search_col, size_col, page_col = st.columns([3, 1, 1])
+    search = search_col.text_input("Search Site Alias", key=f"{key}_search")
+    positions = search_log_rows(log_index, search)
+    page_size = size_col.selectbox("Rows per page", LOG_PAGE_SIZES, key=f"{key}_page_size")
+
+    # A narrower search can leave the remembered page past the end
+    pages = max(1, -(-len(positions) // page_size))
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    page = page_col.number_input("Page", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+
+    page_positions, pages = log_page(positions, page, page_size)
+    st.caption(f"Showing {len(page_positions)} of {len(positions)} rows (page {page} of {pages})")
+    return df.iloc[page_positions]
+
+# Function to load a precomputed report through the parse cache (a rewritten report is loaded again)
+def load_precomputed_report(path):
+    key = ('precomputed', path, os.stat(os.path.join(path, PRECOMPUTED_MANIFEST_FILE)).st_mtime_ns)
+    return cached_parse(key, lambda: read_precomputed_report(path))
+
+# Function to check whether an upload is large enough to be streamed in chunks
+def is_large_upload(uploaded_file):
+    return len(uploaded_file.getvalue()) > STREAMING_THRESHOLD_BYTES
+
+# Function to load the rows of some alarms from a large alarm upload through the parse cache
+def load_alarm_rows(uploaded_file, upload_hash, alarm_names):
+    alarm_names = tuple(alarm_names)
+    return cached_parse(
+        ('alarm-rows', alarm_names, upload_hash), lambda: stream_alarm_rows(uploaded_file.getvalue(), alarm_names)
+    )
+
+# Function to remember the session's last two alarm uploads on every upload, whether delta mode is on or not.
+# A large streamed upload is remembered without its rows, which are read back from its snapshot when needed.
+def track_alarm_upload(source_hash, alarm_df, report_time):
+    state = st.session_state.setdefault('alarm_delta', {'previous': None, 'current': None, 'resolved': False})
+    if state['current'] is None or state['current']['hash'] != source_hash:
+        state['previous'] = state['current']
+        state['current'] = {'hash': source_hash, 'report_time': report_time, 'df': alarm_df}
+        state['resolved'] = False
+    return state
+
+# Function to reopen an alarm snapshot as a previous report, if it has the columns a delta needs
+def alarm_snapshot_report(entry):
+    if entry is None or not all(col in entry['columns'] for col in ALARM_REQUIRED_COLUMNS):
+        return None
+    df, report_time = load_snapshot('alarm', entry['report_time'], source_hash=entry['sha256'])
+    return {'hash': entry['sha256'], 'report_time': report_time, 'df': df}
+
+# Function to compare an alarm upload with the previous report and update the previous count cube by the delta.
+# The previous report is the session's last alarm upload, or else the latest earlier snapshot.
+def load_alarm_delta(source_hash, alarm_df, report_time):
+    state = track_alarm_upload(source_hash, alarm_df, report_time)
+
+    # The previous report is looked up once per upload
+    if not state['resolved']:
+        previous = state['previous']
+        if previous is not None and previous['df'] is None:
+            entries = [e for e in load_snapshot_index() if e['kind'] == 'alarm' and e['sha256'] == previous['hash']] \
+                if SNAPSHOT_DIR else []
+            previous = alarm_snapshot_report(entries[-1] if entries else None)
+        if previous is None and SNAPSHOT_DIR:
+            previous = alarm_snapshot_report(previous_alarm_snapshot(report_time, source_hash))
+        state['previous'] = previous
+        state['resolved'] = True
+
+    previous = state['previous']
+    if previous is None:
+        return None, load_alarm_cube(source_hash, alarm_df), None
+
+    def compute():
+        previous_cube = cached_parse(('alarm-cube', previous['hash']), lambda: build_alarm_cube(previous['df']))
+        delta = alarm_report_delta(previous['df'], alarm_df)
+        cube = apply_cube_delta(previous_cube, build_alarm_cube(delta['added']), build_alarm_cube(delta['removed']))
+        return delta, cube
+    delta, cube = cached_parse(('alarm-delta', previous['hash'], source_hash), compute)
+    return delta, cube, previous['report_time']
+
+# Streamlit app
+def main():
+    # Stage records and log context belong to this rerun of this session
+    if 'diagnostics_session' not in st.session_state:
+        st.session_state['diagnostics_session'] = uuid.uuid4().hex[:12]
+    STAGE_RECORDS.clear()
+    RUN_CONTEXT['session'] = st.session_state['diagnostics_session']
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(levelname)s %(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(os.environ.get('STATUSMATRIX_LOG_LEVEL', 'INFO'))
+
+    st.title("StatusMatrix@STL")
+
+    # File Uploads
+    uploaded_alarm_files = st.file_uploader("Upload Current Alarms Report", type=REPORT_FILE_TYPES, accept_multiple_files=True)
+    uploaded_offline_files = st.file_uploader("Upload Offline Report", type=REPORT_FILE_TYPES, accept_multiple_files=True)
+
+    # Reports of several regions are merged into one, dropping rows already given by an earlier file
+    # Each upload is hashed once per rerun; the hash keys every cached result of it
+    uploads = {}
+    for kind, uploaded_files in (('alarm', uploaded_alarm_files), ('offline', uploaded_offline_files)):
+        try:
+            uploads[kind] = merge_uploads(uploaded_files, kind)
+        except Exception as e:
+            st.error(f"Could not merge the uploaded {UPLOAD_LABELS[kind]} files: {e}")
+            uploads[kind] = None, None
+    (uploaded_alarm_file, alarm_hash), (uploaded_offline_file, offline_hash) = uploads['alarm'], uploads['offline']
+
+    # Initialize Sidebar Filters
+    st.sidebar.header("Filters")
+
+    # Add checkbox for offline site log
+    show_offline_site_log = st.sidebar.checkbox("Show Offline Site Log")
+    #show_offline_site_log = st.markdown(f"{offline_file_time}")
+
+    if uploaded_alarm_file is not None and uploaded_offline_file is not None:
+        try:
+            # Large uploads are aggregated in chunks; their raw rows are only loaded for the site logs
+            stream_alarms = is_large_upload(uploaded_alarm_file)
+            stream_offline = is_large_upload(uploaded_offline_file)
+
+            # Parse both uploads at the same time, once each (cached by content hash); times come from the same read
+            upload_results, upload_errors = load_uploads({
+                'alarm': upload_parse_job(uploaded_alarm_file, alarm_hash, 'alarm', stream_alarms),
+                'offline': upload_parse_job(uploaded_offline_file, offline_hash, 'offline', stream_offline),
+            })
+            # A file that can't be read only hides its own sections
+            for kind, error in upload_errors.items():
+                st.error(f"Could not read the uploaded {UPLOAD_LABELS[kind]}: {error}")
+            alarm_ok = 'alarm' in upload_results
+            offline_ok = 'offline' in upload_results
+
+            if alarm_ok and stream_alarms:
+                alarm_cube, streamed_alarm_names, alarm_columns, alarm_file_time = upload_results['alarm']
+            elif alarm_ok:
+                alarm_df, alarm_file_time = upload_results['alarm']
+                alarm_columns = list(alarm_df.columns)
+            if alarm_ok:
+                # Delta mode compares with the session's last upload, even one made while it was off
+                track_alarm_upload(alarm_hash, None if stream_alarms else alarm_df, alarm_file_time)
+            if offline_ok and stream_offline:
+                offline_counts_df, offline_summary_df, offline_columns, offline_file_time = upload_results['offline']
+            elif offline_ok:
+                offline_df, offline_file_time = upload_results['offline']
+                offline_columns = list(offline_df.columns)
+
+            # === Offline Site Log ===
+            if show_offline_site_log and offline_ok:
+                if stream_offline:
+                    offline_df, _ = load_report(uploaded_offline_file, offline_hash, 'offline')
+                st.markdown("### Offline Site Log")
+                st.markdown(f"{offline_file_time}")
+                columns_to_display = OFFLINE_LOG_COLUMNS
+
+                # Check if required columns exist in the offline file
+                if all(col in offline_df.columns for col in columns_to_display):
+                    offline_log_index = load_offline_log_index(offline_hash, offline_df)
+                    offline_page_df = log_page_controls(offline_df[columns_to_display], offline_log_index, 'offline_log')
+                    with timed_stage('render:offline_site_log', len(offline_page_df)):
+                        st.dataframe(offline_page_df)
+                else:
+                    missing_columns = [col for col in columns_to_display if col not in offline_df.columns]
+                    st.error(f"Missing columns in the uploaded offline report: {', '.join(missing_columns)}")
+
+            # Other functionality (processing alarms, etc.) continues here...
+            # Make sure to include your other checks and features from the previous code
+                # Get unique clusters for filtering
+            if offline_ok and stream_offline:
+                offline_clusters = sorted(offline_counts_df.index.get_level_values('Cluster').unique().tolist())
+            elif offline_ok:
+                offline_clusters = sorted(offline_df['Cluster'].dropna().unique().tolist())
+            elif alarm_ok and not stream_alarms and 'Cluster' in alarm_columns:
+                offline_clusters = sorted(alarm_df['Cluster'].dropna().unique().tolist())
+            else:
+                offline_clusters = []
+            offline_clusters.insert(0, "All")  # Add 'All' option
+            selected_offline_cluster = st.sidebar.selectbox(
+                "Select Cluster",
+                options=offline_clusters,
+                index=0
+            )
 
-        # === Site-Wise Log Filters ===
-        st.sidebar.subheader("Site-Wise Log Filters")
-        view_site_wise = st.sidebar.checkbox("View Site-Wise Log")
-        if view_site_wise:
-            site_wise_alarms = st.sidebar.selectbox(
-                "Select Alarm for Site-Wise Log",
+     # === Current Alarms Filters ===
+            st.sidebar.subheader("Current Alarms Filters")
+            st.sidebar.text("[select alarm first]")
+            # Get unique alarm names
+            if not alarm_ok:
+                alarm_names = []
+            elif stream_alarms:
+                alarm_names = list(streamed_alarm_names)
+            else:
+                alarm_names = sorted(alarm_df['Alarm Name'].dropna().unique().tolist())
+            alarm_names.insert(0, "All")  # Add 'All' option
+            selected_alarm = st.sidebar.selectbox(
+                "Select Alarm to Filter",
                 options=alarm_names,
                 index=0
             )
+            # Delta mode compares full alarm reports, so it needs the rows of both
+            delta_mode = alarm_ok and not stream_alarms and st.sidebar.checkbox("Delta Mode (changes since previous report)")
+
+            # === Site-Wise Log Filters ===
+            st.sidebar.subheader("Site-Wise Log Filters")
+            view_site_wise = st.sidebar.checkbox("View Site-Wise Log")
+            if view_site_wise:
+                site_wise_alarms = st.sidebar.selectbox(
+                    "Select Alarm for Site-Wise Log",
+                    options=alarm_names,
+                    index=0
+                )
 
-        # Determine if dark mode is active
-        # Note: Streamlit does not provide a direct method to detect theme,
-        # so this function is a placeholder and may need adjustment based on Streamlit version
-        dark_mode = is_dark_mode()
+            # === Offline Sites with Alarms Filters ===
+            st.sidebar.subheader("Offline Sites with Alarms")
+            view_site_join = alarm_ok and offline_ok and st.sidebar.checkbox("Show Offline Sites with Alarms")
+            if view_site_join:
+                join_alarms = st.sidebar.multiselect(
+                    "Alarms to Match (none matches all)",
+                    options=alarm_names[1:],
+                    default=[name for name in ['Mains Fail', 'Battery Low'] if name in alarm_names]
+                )
 
-        # Process the Offline Report
-        pivot_offline, total_offline_count = create_offline_pivot(offline_df)
+            # Determine if dark mode is active
+            # Note: Streamlit does not provide a direct method to detect theme,
+            # so this function is a placeholder and may need adjustment based on Streamlit version
+            dark_mode = is_dark_mode()
+
+            # === Offline Report ===
+            if offline_ok:
+                # Process the Offline Report
+                if stream_offline:
+                    pivot_offline, offline_totals = offline_pivot_from_counts(offline_counts_df)
+                else:
+                    pivot_offline, offline_totals = create_offline_pivot(offline_df)
+
+                # Apply Offline Cluster Filters; the Total row always shows the totals of all clusters
+                if selected_offline_cluster != "All":
+                    filtered_pivot_offline = format_pivot(
+                        pivot_cluster_rows(pivot_offline, selected_offline_cluster), offline_totals
+                    )
+                else:
+                    filtered_pivot_offline = format_pivot(pivot_offline, offline_totals)
 
-        # Apply Offline Cluster Filters
-        if selected_offline_cluster != "All":
-            if 'Total' in pivot_offline['Cluster'].values:
-                filtered_pivot_offline = pivot_offline[
-                    (pivot_offline['Cluster'] == selected_offline_cluster) | (pivot_offline['Cluster'] == 'Total')
-                ]
-            else:
-                filtered_pivot_offline = pivot_offline[pivot_offline['Cluster'] == selected_offline_cluster]
-        else:
-            filtered_pivot_offline = pivot_offline.copy()
-
-        # Display the Offline Report
-        st.markdown("### Offline Report")
-        st.markdown(f"**Total Offline Count:** {total_offline_count}")
-        st.markdown(f"{offline_file_time}")
-
-        # Apply styling
-        styled_pivot_offline = style_dataframe(filtered_pivot_offline, ['Less than 24 hours', 'More than 24 hours', 'More than 72 hours'], dark_mode)
-
-        # Display styled DataFrame
-        st.dataframe(styled_pivot_offline)
-
-        # Generate Offline Summary Table
-        st.markdown("### Long Time Offline Sites")
-        st.markdown(f"{offline_file_time}")
-        offline_summary_df = calculate_duration(offline_df)
-        st.dataframe(offline_summary_df)
-
-        # Downloadable Offline Summary Table
-        offline_summary_excel = to_excel({"Offline Summary": offline_summary_df})
-        st.download_button(
-            label="Download Offline Summary",
-            data=offline_summary_excel,
-            file_name="Offline_Summary.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+                # Display the Offline Report
+                st.markdown("### Offline Report")
+                st.markdown(f"**Total Offline Count:** {offline_totals['Total']}")
+                st.markdown(f"{offline_file_time}")
 
+                # Apply styling
+                styled_pivot_offline = style_dataframe(filtered_pivot_offline, offline_duration_labels(), dark_mode)
 
+                # Display styled DataFrame
+                with timed_stage('render:offline_pivot', len(filtered_pivot_offline)):
+                    st.dataframe(styled_pivot_offline)
+
+                # Generate Offline Summary Table
+                st.markdown("### Long Time Offline Sites")
+                st.markdown(f"{offline_file_time}")
+                if parse_report_time(offline_file_time) is None:
+                    st.caption("The report holds no report time, so durations are measured from when it was uploaded.")
+                # The table and its workbook are cached with the upload and the clock its durations are measured at
+                reference_time = upload_reference_time(uploaded_offline_file, offline_hash, offline_file_time)
+                if not stream_offline:
+                    offline_summary_df = cached_parse(
+                        ('offline-summary', offline_hash, reference_time),
+                        lambda: calculate_duration(offline_df, reference_time)
+                    )
+                with timed_stage('render:long_time_offline', len(offline_summary_df)):
+                    st.dataframe(offline_summary_df)
 
-        # === Site-Wise Log Display ===
-        if view_site_wise:
-            st.markdown("### Site-Wise Log")
-            if site_wise_alarms != "All":
-                site_wise_log_df = create_site_wise_log(alarm_df, site_wise_alarms)
-                # Apply styling if needed
-                styled_site_wise_log = style_dataframe(site_wise_log_df, [], dark_mode)
-                st.dataframe(styled_site_wise_log)
-            else:
-                st.info("No specific alarm selected for Site-Wise Log.")
+                # Downloadable Offline Summary Table
+                offline_summary_excel = cached_parse(
+                    ('offline-summary-xlsx', offline_hash, reference_time),
+                    lambda: to_excel({"Offline Summary": offline_summary_df})
+                )
+                st.download_button(
+                    label="Download Offline Summary",
+                    data=offline_summary_excel,
+                    file_name="Offline_Summary.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
 
-        # Check for required columns in Alarm Report
-        alarm_required_columns = ['RMS Station', 'Cluster', 'Zone', 'Site Alias', 'Alarm Name', 'Alarm Time', 'Duration Slot (Hours)']
-        if not all(col in alarm_df.columns for col in alarm_required_columns):
-            st.error(f"The uploaded Alarm Report file is missing one of the required columns: {alarm_required_columns}")
-        else:
-            # Extract client information
-            alarm_df['Client'] = alarm_df['Site Alias'].apply(extract_client)
-            alarm_df = alarm_df[~alarm_df['Client'].isnull()]
-
- 
-            # Add the current time to the alarm header
-            st.markdown(f"### Current Alarms Report")
-
-            # Define the priority order for the alarm names
-            priority_order = [
-                'Mains Fail',
-                'Battery Low',
-                'DCDB-01 Primary Disconnect',
-                'PG Run',
-                'MDB Fault',
-                'Door Open'
-            ]
-
-            # Separate prioritized alarms from the rest
-            prioritized_alarms = [name for name in priority_order if name in alarm_names]
-            non_prioritized_alarms = [name for name in alarm_names if name not in priority_order]
-
-            # Combine both lists to maintain the desired order
-            ordered_alarm_names = prioritized_alarms + non_prioritized_alarms
-
-            # Create a dictionary to store all pivot tables for current alarms
-            alarm_data = {}
-
-            # Process alarms based on selection
-            for alarm_name in ordered_alarm_names:
-                # Skip alarms if a specific alarm is selected and it's not the current one
-                if selected_alarm != "All" and alarm_name != selected_alarm:
-                    continue
+            # === Site-Wise Log Display ===
+            if view_site_wise and alarm_ok:
+                st.markdown("### Site-Wise Log")
+                if site_wise_alarms != "All":
+                    site_wise_log_df, site_wise_index = load_site_wise_log(
+                        uploaded_alarm_file, alarm_hash, None if stream_alarms else alarm_df, site_wise_alarms
+                    )
+                    site_wise_page_df = log_page_controls(site_wise_log_df, site_wise_index, 'site_wise_log')
+                    # Apply styling if needed (only the visible page)
+                    styled_site_wise_log = style_dataframe(site_wise_page_df, [], dark_mode)
+                    with timed_stage('render:site_wise_log', len(site_wise_page_df)):
+                        st.dataframe(styled_site_wise_log)
+                else:
+                    st.info("No specific alarm selected for Site-Wise Log.")
+
+            # === Offline Sites with Alarms Display ===
+            if view_site_join and not (
+                all(col in alarm_columns for col in ALARM_REQUIRED_COLUMNS)
+                and all(col in offline_columns for col in OFFLINE_LOG_COLUMNS)
+            ):
+                st.error("Matching offline sites with alarms needs the required columns of both reports.")
+            elif view_site_join:
+                st.markdown("### Offline Sites with Alarms")
+                site_join_key = (
+                    alarm_hash, offline_hash, tuple(join_alarms)
+                )
+                site_join = cached_parse(
+                    ('site-join',) + site_join_key,
+                    lambda: join_alarm_offline(
+                        load_alarm_rows(uploaded_alarm_file, alarm_hash, join_alarms or alarm_names[1:])
+                        if stream_alarms else alarm_df,
+                        load_report(uploaded_offline_file, offline_hash, 'offline')[0] if stream_offline else offline_df,
+                        join_alarms
+                    )
+                )
+                site_join_df, site_join_pivot, site_join_totals = site_join
+                st.markdown(f"**Offline Sites with Alarms:** {site_join_totals['Total']}")
+                site_join_table = format_pivot(site_join_pivot, site_join_totals)
+                with timed_stage('render:site_join_pivot', len(site_join_table)):
+                    st.dataframe(style_dataframe(site_join_table, [], dark_mode))
+
+                site_join_index = cached_parse(('site-join-index',) + site_join_key, lambda: build_log_index(site_join_df))
+                site_join_page_df = log_page_controls(site_join_df, site_join_index, 'site_join')
+                with timed_stage('render:site_join_sites', len(site_join_page_df)):
+                    st.dataframe(site_join_page_df)
+                st.download_button(
+                    label="Download Offline Sites with Alarms",
+                    data=cached_parse(
+                        ('site-join-xlsx',) + site_join_key,
+                        lambda: to_excel({"Cluster Zone Counts": site_join_table, "Sites": site_join_df})
+                    ),
+                    file_name="Offline_Sites_with_Alarms.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
 
-                # Initialize the filter criteria
-                filtered_alarm_df = alarm_df.copy()
+            # Check for required columns in Alarm Report
+            if alarm_ok and not all(col in alarm_columns for col in ALARM_REQUIRED_COLUMNS):
+                st.error(f"The uploaded Alarm Report file is missing one of the required columns: {ALARM_REQUIRED_COLUMNS}")
+            elif alarm_ok:
+
+                # Add the current time to the alarm header
+                st.markdown(f"### Current Alarms Report")
+
+                # Order the alarm names by priority
+                ordered_alarm_names = order_alarm_names(alarm_names)
+
+                # Create a dictionary to store all pivot tables for current alarms
+                alarm_data = {}
+
+                # Count every alarm in one pass; each unfiltered pivot is a slice of this cube
+                if selected_alarm == "All" and not stream_alarms:
+                    alarm_cube = None
+                    if delta_mode:
+                        # Pivots of a refreshed report come from the previous cube plus the changed rows only
+                        delta, alarm_cube, previous_file_time = load_alarm_delta(alarm_hash, alarm_df, alarm_file_time)
+                        if delta is None:
+                            st.info("No previous alarm report to compare with; showing the full report.")
+                        else:
+                            st.markdown("#### Changes Since the Previous Report")
+                            st.markdown(f"{previous_file_time}")
+                            st.markdown(
+                                f"**New:** {len(delta['new'])} | **Cleared:** {len(delta['cleared'])} | "
+                                f"**Still Active:** {len(delta['persisting'])}"
+                            )
+                            delta_columns = ['Site Alias', 'Alarm Name', 'Cluster', 'Zone', 'Alarm Time']
+                            with st.expander("New Alarms"):
+                                st.dataframe(delta['new'][delta_columns])
+                            with st.expander("Cleared Alarms"):
+                                st.dataframe(delta['cleared'][delta_columns])
+                    if alarm_cube is None:
+                        alarm_cube = load_alarm_cube(alarm_hash, alarm_df)
+
+                # Filter state the exported workbook depends on
+                alarm_filter_state = (selected_alarm,)
+
+                # Process alarms based on selection
+                for alarm_name in ordered_alarm_names:
+                    # Skip alarms if a specific alarm is selected and it's not the current one
+                    if selected_alarm != "All" and alarm_name != selected_alarm:
+                        continue
+
+                    if selected_alarm == "All":
+                        alarm_data[alarm_name] = pivot_from_cube(alarm_cube, alarm_name)
+                        continue
+
+                    # Filter by selected alarm through the index built once per upload
+                    if stream_alarms:
+                        source_alarm_df = load_alarm_rows(uploaded_alarm_file, alarm_hash, [alarm_name])
+                        alarm_index = load_alarm_index(alarm_hash, source_alarm_df, alarm_name)
+                    else:
+                        source_alarm_df = alarm_df
+                        alarm_index = load_alarm_index(alarm_hash, alarm_df)
 
-                if selected_alarm != "All":
-                    # Filter by selected alarm
-                    filtered_alarm_df = filtered_alarm_df[filtered_alarm_df['Alarm Name'] == alarm_name]
-                    
                     # Apply cluster filter
-                    if selected_offline_cluster != "All":
-                        filtered_alarm_df = filtered_alarm_df[filtered_alarm_df['Cluster'] == selected_offline_cluster]
-                    
+                    positions = alarm_index_positions(alarm_index, alarm_name, selected_offline_cluster)
+
                     # Apply date range filter
-                    alarm_dates = pd.to_datetime(filtered_alarm_df['Alarm Time'], format='%d/%m/%Y %I:%M:%S %p', errors='coerce')
-                    min_date = alarm_dates.min().date()
-                    max_date = alarm_dates.max().date()
-                    selected_date_range = st.sidebar.date_input(
-                        f"Select Date Range for {alarm_name}",
-                        value=(min_date, max_date),
-                        min_value=min_date,
-                        max_value=max_date,
-                        key=f"date_{alarm_name}"
-                    )
-                    # Ensure date range is a tuple of two dates
-                    if isinstance(selected_date_range, tuple) and len(selected_date_range) == 2:
-                        start_date, end_date = selected_date_range
+                    min_date, max_date = alarm_date_bounds(alarm_index, positions)
+                    if min_date is None:
+                        positions = positions[:0]
                     else:
-                        start_date, end_date = min_date, max_date
-
-                    filtered_alarm_df['Alarm Time Parsed'] = pd.to_datetime(
-                        filtered_alarm_df['Alarm Time'], 
-                        format='%d/%m/%Y %I:%M:%S %p', 
-                        errors='coerce'
+                        selected_date_range = st.sidebar.date_input(
+                            f"Select Date Range for {alarm_name}",
+                            value=(min_date, max_date),
+                            min_value=min_date,
+                            max_value=max_date,
+                            key=f"date_{alarm_name}"
+                        )
+                        # Ensure date range is a tuple of two dates
+                        if isinstance(selected_date_range, tuple) and len(selected_date_range) == 2:
+                            start_date, end_date = selected_date_range
+                        else:
+                            start_date, end_date = min_date, max_date
+
+                        positions = slice_alarm_dates(alarm_index, positions, start_date, end_date)
+                        alarm_filter_state = (selected_alarm, selected_offline_cluster, start_date, end_date)
+
+                    filtered_alarm_df = source_alarm_df.iloc[positions]
+
+                    # Create pivot table for the filtered data (DCDB-01 exclusion is applied by the cube)
+                    alarm_data[alarm_name] = create_pivot_table(filtered_alarm_df, alarm_name)
+
+                # Lay out each typed pivot once for display and export
+                alarm_tables = {alarm_name: format_pivot(*data) for alarm_name, data in alarm_data.items()}
+
+                # Display each pivot table for the current alarms with styling
+                for alarm_name, pivot in alarm_tables.items():
+                    totals = alarm_data[alarm_name][1]
+                    st.markdown(f"### **{alarm_name}**")
+                    st.markdown(f"**Alarm Count:** {totals['Total']}")
+                    st.markdown(f"{alarm_file_time}")
+
+                    # Identify duration columns
+                    duration_cols = duration_labels()
+
+                    # Apply styling
+                    styled_pivot = style_dataframe(pivot, duration_cols, dark_mode)
+
+                    # Display styled DataFrame
+                    with timed_stage('render:alarm_pivot', len(pivot)):
+                        st.dataframe(styled_pivot)
+
+                # Prepare download for Current Alarms Report only if there is data
+                if alarm_data:
+                    # Export the laid out pivot table of each alarm
+                    current_alarm_excel_data = cached_parse(
+                        ('alarm-xlsx', alarm_hash) + alarm_filter_state,
+                        lambda: to_excel(alarm_tables)
                     )
-                    filtered_alarm_df = filtered_alarm_df[
-                        (filtered_alarm_df['Alarm Time Parsed'].dt.date >= start_date) &
-                        (filtered_alarm_df['Alarm Time Parsed'].dt.date <= end_date)
-                    ]
-
-                # Special filter for "DCDB-01 Primary Disconnect"
-                if alarm_name == 'DCDB-01 Primary Disconnect':
-                    filtered_alarm_df = filtered_alarm_df[~filtered_alarm_df['RMS Station'].str.startswith('L')]
-
-                # Create pivot table for the filtered data
-                pivot, total_count = create_pivot_table(filtered_alarm_df, alarm_name)
-                alarm_data[alarm_name] = (pivot, total_count)
+                    st.download_button(
+                        label="Download Current Alarms Report",
+                        data=current_alarm_excel_data,
+                        file_name=f"Current_Alarms_Report.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    )
+                else:
+                    st.warning("No current alarm data available for export.")
+
+        except Exception as e:
+            st.error(f"An error occurred while processing the files: {e}")
+
+    # === Precomputed Reports ===
+    # Without uploads the page opens the reports the folder watcher has already computed
+    elif list_precomputed_reports():
+        precomputed_paths = list_precomputed_reports()
+        selected_precomputed = st.sidebar.selectbox(
+            "Precomputed Report",
+            options=precomputed_paths,
+            index=0,
+            format_func=lambda path: os.path.splitext(os.path.basename(path))[0]
+        )
+        try:
+            precomputed = load_precomputed_report(selected_precomputed)
+            result = precomputed['result']
+            dark_mode = is_dark_mode()
+            st.info(f"Precomputed report '{precomputed['key']}' saved at {precomputed['saved_at']}. Upload both files to explore it with filters.")
+
+            # Display the Offline Report
+            st.markdown("### Offline Report")
+            st.markdown(f"**Total Offline Count:** {result['total_offline_count']}")
+            st.markdown(f"{result['offline_file_time']}")
+            pivot_offline = format_pivot(result['pivot_offline'], result['offline_totals'])
+            with timed_stage('render:offline_pivot', len(pivot_offline)):
+                st.dataframe(style_dataframe(pivot_offline, offline_duration_labels(), dark_mode))
+
+            st.markdown("### Long Time Offline Sites")
+            st.markdown(f"{result['offline_file_time']}")
+            with timed_stage('render:long_time_offline', len(result['offline_summary_df'])):
+                st.dataframe(result['offline_summary_df'])
+            st.download_button(
+                label="Download Offline Summary",
+                data=precomputed['excel_files']["Offline_Summary.xlsx"],
+                file_name="Offline_Summary.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
 
-            # Display each pivot table for the current alarms with styling
-            for alarm_name, (pivot, total_count) in alarm_data.items():
+            # Display the pivot table of each alarm
+            st.markdown("### Current Alarms Report")
+            for alarm_name, (pivot, totals) in result['alarm_data'].items():
                 st.markdown(f"### **{alarm_name}**")
-                st.markdown(f"**Alarm Count:** {total_count}")
-                st.markdown(f"{alarm_file_time}")
-
-                # Identify duration columns
-                duration_cols = ['0+', '2+', '4+', '8+']
-
-                # Apply styling
-                styled_pivot = style_dataframe(pivot, duration_cols, dark_mode)
-
-                # Display styled DataFrame
-                st.dataframe(styled_pivot)
-
-            # Prepare download for Current Alarms Report only if there is data
-            if alarm_data:
-                # Create a dictionary with each alarm's pivot table
-                current_alarm_excel_dict = {alarm_name: data[0] for alarm_name, data in alarm_data.items()}
-                current_alarm_excel_data = to_excel(current_alarm_excel_dict)
+                st.markdown(f"**Alarm Count:** {totals['Total']}")
+                st.markdown(f"{result['alarm_file_time']}")
+                pivot = format_pivot(pivot, totals)
+                with timed_stage('render:alarm_pivot', len(pivot)):
+                    st.dataframe(style_dataframe(pivot, duration_labels(), dark_mode))
+            if "Current_Alarms_Report.xlsx" in precomputed['excel_files']:
                 st.download_button(
                     label="Download Current Alarms Report",
-                    data=current_alarm_excel_data,
-                    file_name=f"Current_Alarms_Report.xlsx",
+                    data=precomputed['excel_files']["Current_Alarms_Report.xlsx"],
+                    file_name="Current_Alarms_Report.xlsx",
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                 )
-            else:
-                st.warning("No current alarm data available for export.")
-
-    except Exception as e:
-        st.error(f"An error occurred while processing the files: {e}")
+        except Exception as e:
+            st.error(f"Could not open the precomputed report: {e}")
+
+    # === Trends ===
+    # Trend charts read only the rollup of the saved snapshots, never their rows
+    if SNAPSHOT_DIR and st.sidebar.checkbox("Show Trends"):
+        alarm_rollup, offline_rollup = update_rollup()
+        st.markdown("### Trends")
+        st.markdown(f"Last {TREND_DAYS} days of saved reports")
+        if alarm_rollup.empty and offline_rollup.empty:
+            st.info("No report snapshots saved yet.")
+        else:
+            trend_clusters = sorted(set(alarm_rollup['Cluster']) | set(offline_rollup['Cluster']))
+            trend_cluster = st.sidebar.selectbox("Select Trend Cluster", options=["All"] + trend_clusters, index=0)
+            # One line per Cluster, or per Zone of the selected Cluster
+            trend_by = 'Cluster' if trend_cluster == "All" else 'Zone'
+            if trend_cluster != "All":
+                alarm_rollup = alarm_rollup[alarm_rollup['Cluster'] == trend_cluster]
+                offline_rollup = offline_rollup[offline_rollup['Cluster'] == trend_cluster]
+
+            trend_alarms = order_alarm_names(sorted(alarm_rollup['Alarm Name'].unique().tolist()))
+            if trend_alarms:
+                trend_alarm = st.sidebar.selectbox("Select Trend Alarm", options=trend_alarms, index=0)
+                st.markdown(f"#### {trend_alarm}")
+                st.line_chart(trend_lines(alarm_rollup[alarm_rollup['Alarm Name'] == trend_alarm], trend_by))
+
+            st.markdown("#### Offline Sites")
+            st.line_chart(trend_lines(offline_rollup[offline_rollup['Duration Class'] == 'Total'], trend_by))
+
+    # === Report Snapshots ===
+    if SNAPSHOT_DIR:
+        with st.sidebar.expander("Report Snapshots"):
+            snapshots = pd.DataFrame(load_snapshot_index(), columns=['kind', 'report_time', 'rows', 'saved_at'])
+            st.dataframe(snapshots.iloc[::-1].reset_index(drop=True))
+
+    # === Diagnostics ===
+    with st.sidebar.expander("Diagnostics"):
+        summary = stage_summary()
+        st.dataframe(summary)
+        cache_stats = parse_cache_stats()
+        st.markdown(
+            f"**Shared cache:** {cache_stats['entries']} entries, "
+            f"{cache_stats['memory_mb']} of {cache_stats['ceiling_mb']} MB, "
+            f"{cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['evictions']} evictions"
+        )
 
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import logging
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from AlarmReportGenerator import (
+    REPORT_FILE_TYPES, RUN_CONTEXT, SNAPSHOT_DIR, STAGE_RECORDS, report_excel_files, run_report_pipeline,
+)
+
+# Words dropped from a file name to find the region shared by an alarm/offline pair
+PAIR_NAME_STOPWORDS = {'current', 'alarm', 'alarms', 'offline', 'report', 'reports'}
+
+# Function to reduce a workbook file name to the region key shared by its pair
+def pair_key(file_name):
+    stem = os.path.splitext(file_name)[0].lower()
+    words = [word for word in re.split(r'[^0-9a-z]+', stem) if word and word not in PAIR_NAME_STOPWORDS]
+    return '_'.join(words) or 'report'
+
+# Extensions of the report files picked up from a directory
+REPORT_EXTENSIONS = tuple(f".{file_type}" for file_type in REPORT_FILE_TYPES)
+
+# Function to match the Current Alarms and Offline Report files (XLSX, CSV or Parquet) of a directory into pairs
+def find_report_pairs(input_dir):
+    alarm_files, offline_files = {}, {}
+    for file_name in sorted(os.listdir(input_dir)):
+        if not file_name.lower().endswith(REPORT_EXTENSIONS) or file_name.startswith('~$'):
+            continue
+        lowered = file_name.lower()
+        if 'offline' in lowered:
+            offline_files[pair_key(file_name)] = os.path.join(input_dir, file_name)
+        elif 'alarm' in lowered:
+            alarm_files[pair_key(file_name)] = os.path.join(input_dir, file_name)
+
+    pairs = [(key, alarm_files[key], offline_files[key]) for key in sorted(alarm_files) if key in offline_files]
+    unpaired = sorted(set(alarm_files) ^ set(offline_files))
+    return pairs, unpaired
+
+# Function to read the files of one pair in a worker, whose stage records and log lines then belong to this pair
+def read_pair(key, alarm_path, offline_path):
+    STAGE_RECORDS.clear()
+    RUN_CONTEXT['pair'] = key
+
+    with open(alarm_path, 'rb') as f:
+        alarm_data = f.read()
+    with open(offline_path, 'rb') as f:
+        offline_data = f.read()
+    return alarm_data, offline_data
+
+# Function to run the pipeline on one pair and write its Excel outputs
+def process_pair(key, alarm_path, offline_path, output_dir, snapshot_dir=None):
+    alarm_data, offline_data = read_pair(key, alarm_path, offline_path)
+    result = run_report_pipeline(alarm_data, offline_data, snapshot_dir)
+
+    written = []
+    for file_name, content in report_excel_files(result).items():
+        path = os.path.join(output_dir, f"{key}_{file_name}")
+        with open(path, 'wb') as f:
+            f.write(content)
+        written.append(path)
+    return written
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate the StatusMatrix Excel reports for every alarm/offline workbook pair in a directory."
+    )
+    parser.add_argument('input_dir', help="directory holding the Current Alarms and Offline Report files (XLSX, CSV or Parquet)")
+    parser.add_argument('-o', '--output-dir', help="where to write the reports (default: INPUT_DIR/output)")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(),
+                        help="number of worker processes (default: number of cores)")
+    parser.add_argument('--snapshot-dir', default=SNAPSHOT_DIR,
+                        help=f"where to keep columnar snapshots of the ingested reports; '' disables them (default: {SNAPSHOT_DIR})")
+    parser.add_argument('--log-level', default='WARNING',
+                        help="level of the structured stage log lines, e.g. INFO (default: WARNING)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+
+    output_dir = args.output_dir or os.path.join(args.input_dir, 'output')
+    os.makedirs(output_dir, exist_ok=True)
+
+    pairs, unpaired = find_report_pairs(args.input_dir)
+    for key in unpaired:
+        print(f"Skipping '{key}': no matching alarm/offline workbook", file=sys.stderr)
+    if not pairs:
+        print("No alarm/offline workbook pairs found.", file=sys.stderr)
+        return 1
+
+    failures = 0
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = {
+            executor.submit(process_pair, key, alarm_path, offline_path, output_dir, args.snapshot_dir): key
+            for key, alarm_path, offline_path in pairs
+        }
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                for path in future.result():
+                    print(f"{key}: wrote {path}")
+            except Exception as e:
+                failures += 1
+                print(f"{key}: failed: {e}", file=sys.stderr)
+
+    print(f"Processed {len(pairs) - failures}/{len(pairs)} report pairs.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+import argparse
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+# Largest number of data rows that fit on one worksheet below the 3 preamble/header rows
+MAX_SHEET_ROWS = 1048576 - 3
+
+CLIENTS = ['GP', 'BL', 'ROBI', 'TT', 'GP,BL']
+ALARM_NAMES = [
+    'Mains Fail', 'Battery Low', 'DCDB-01 Primary Disconnect', 'PG Run', 'MDB Fault', 'Door Open',
+    'High Temperature', 'Rectifier Fail', 'Smoke Alarm', 'Fuel Low', 'Aviation Light Fail', 'AC Fail',
+]
+OFFLINE_DURATIONS = ['Less than 24 hours', 'More than 24 hours', 'More than 48 hours', 'More than 72 hours']
+
+# Function to generate a Current Alarms Report frame with the real export's columns
+def generate_alarm_frame(rows, report_time, seed=0, sites=20000, clusters=12, zones_per_cluster=6):
+    rng = np.random.default_rng(seed)
+    site_ids = rng.integers(0, sites, rows)
+    cluster_ids = site_ids % clusters
+    zone_ids = (site_ids // clusters) % zones_per_cluster
+    client_ids = site_ids % len(CLIENTS)
+
+    # Alarm names are skewed towards the common ones, as in real exports
+    weights = 1.0 / np.arange(1, len(ALARM_NAMES) + 1)
+    alarm_ids = rng.choice(len(ALARM_NAMES), rows, p=weights / weights.sum())
+
+    hours = rng.exponential(10.0, rows)
+    alarm_times = pd.Timestamp(report_time) - pd.to_timedelta(hours, unit='h')
+
+    # A few sites have no client in their alias and some slots are missing
+    site_names = 'SITE' + pd.Series(site_ids).astype(str).str.zfill(6)
+    site_alias = site_names + ' (' + pd.Series(np.asarray(CLIENTS, dtype=object)[client_ids]) + ')'
+    no_client = rng.random(rows) < 0.02
+    site_alias[no_client] = site_names[no_client]
+    duration_slot = np.floor(hours)
+    duration_slot[rng.random(rows) < 0.01] = np.nan
+
+    rms_prefix = pd.Series(np.where(rng.random(rows) < 0.15, 'L', 'D'))
+    return pd.DataFrame({
+        'RMS Station': rms_prefix + site_names.str[4:],
+        'Site': 'S' + site_names.str[4:],
+        'Site Alias': site_alias,
+        'Cluster': 'Cluster ' + pd.Series(cluster_ids + 1).astype(str),
+        'Zone': 'Zone ' + pd.Series(cluster_ids + 1).astype(str) + '-' + pd.Series(zone_ids + 1).astype(str),
+        'Alarm Name': np.asarray(ALARM_NAMES, dtype=object)[alarm_ids],
+        'Alarm Time': alarm_times.strftime('%d/%m/%Y %I:%M:%S %p'),
+        'Duration': pd.Series(hours.astype(int)).astype(str) + 'h ' + pd.Series((hours % 1 * 60).astype(int)).astype(str) + 'm',
+        'Duration Slot (Hours)': duration_slot,
+        'Severity': rng.choice(['Critical', 'Major', 'Minor'], rows),
+        'Site Type': rng.choice(['Macro', 'Micro', 'Indoor'], rows),
+    })
+
+# Function to generate an Offline Report frame with the real export's columns
+def generate_offline_frame(rows, report_time, seed=0, clusters=12, zones_per_cluster=6):
+    rng = np.random.default_rng(seed + 1)
+    site_ids = np.arange(rows)
+    cluster_ids = site_ids % clusters
+    zone_ids = (site_ids // clusters) % zones_per_cluster
+
+    hours = rng.exponential(40.0, rows)
+    duration_ids = np.searchsorted([24, 48, 72], hours, side='right')
+    last_online = pd.Timestamp(report_time) - pd.to_timedelta(hours, unit='h')
+
+    site_names = pd.Series(site_ids).astype(str).str.zfill(6)
+    clients = pd.Series(np.asarray(CLIENTS, dtype=object)[site_ids % len(CLIENTS)])
+    return pd.DataFrame({
+        'Site': 'S' + site_names,
+        'Site Alias': 'SITE' + site_names + ' (' + clients + ')',
+        'Zone': 'Zone ' + pd.Series(cluster_ids + 1).astype(str) + '-' + pd.Series(zone_ids + 1).astype(str),
+        'Cluster': 'Cluster ' + pd.Series(cluster_ids + 1).astype(str),
+        'Last Online Time': last_online.strftime('%Y-%m-%d %H:%M:%S'),
+        'Duration': np.asarray(OFFLINE_DURATIONS, dtype=object)[duration_ids],
+        'Site Type': rng.choice(['Macro', 'Micro', 'Indoor'], rows),
+    })
+
+# Function to write a frame in the RMS layout: title in row 1, timestamp in row 2, headers on row 3
+def write_report(df, path, title, report_time):
+    if len(df) > MAX_SHEET_ROWS:
+        raise ValueError(f"{len(df)} rows do not fit on one worksheet (max {MAX_SHEET_ROWS})")
+
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+    worksheet = workbook.add_worksheet('Sheet1')
+    worksheet.write(0, 0, title)
+    worksheet.write(1, 0, f"Report Time: {report_time:%Y-%m-%d %H:%M:%S}")
+    worksheet.write_row(2, 0, list(df.columns))
+    for i, row in enumerate(df.astype(object).itertuples(index=False, name=None)):
+        for j, value in enumerate(row):
+            if not pd.isna(value):
+                worksheet.write(i + 3, j, value)
+    workbook.close()
+
+# Function to generate and write a Current Alarms / Offline Report workbook pair
+def generate_report_pair(output_dir, alarm_rows, offline_rows=None, seed=0, report_time=None):
+    report_time = report_time or datetime(2024, 5, 20, 10, 0, 0)
+    offline_rows = offline_rows if offline_rows is not None else max(1, alarm_rows // 5)
+    os.makedirs(output_dir, exist_ok=True)
+
+    alarm_path = os.path.join(output_dir, f"Current Alarms {alarm_rows}.xlsx")
+    offline_path = os.path.join(output_dir, f"Offline Report {alarm_rows}.xlsx")
+    write_report(generate_alarm_frame(alarm_rows, report_time, seed), alarm_path, 'Current Alarms', report_time)
+    write_report(generate_offline_frame(offline_rows, report_time, seed), offline_path, 'Offline Report', report_time)
+    return alarm_path, offline_path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write synthetic Current Alarms and Offline Report workbooks.")
+    parser.add_argument('output_dir')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000], help="alarm rows per workbook")
+    parser.add_argument('--offline-rows', type=int, help="offline rows (default: a fifth of the alarm rows)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    for rows in args.rows:
+        for path in generate_report_pair(args.output_dir, rows, args.offline_rows, args.seed):
+            print(f"wrote {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import AlarmReportGenerator as arg  # noqa: E402
+from generate_reports import (  # noqa: E402
+    MAX_SHEET_ROWS, generate_alarm_frame, generate_offline_frame, write_report
+)
+
+REPORT_TIME = datetime(2024, 5, 20, 10, 0, 0)
+
+# Function to time a stage and, when requested, measure its peak traced memory in a second run
+def measure(fn, track_memory=True):
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+
+    peak = None
+    if track_memory:
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, {'seconds': round(seconds, 6), 'peak_bytes': peak}
+
+# Function to load a report pair from disk, or build the loaded frames in memory above the sheet row limit
+def load_frames(alarm_rows, offline_rows, seed, data_dir, stages, track_memory):
+    alarm_raw = generate_alarm_frame(alarm_rows, REPORT_TIME, seed)
+    offline_raw = generate_offline_frame(offline_rows, REPORT_TIME, seed)
+
+    if alarm_rows > MAX_SHEET_ROWS or offline_rows > MAX_SHEET_ROWS:
+        # XLSX cannot hold this many rows on one sheet: benchmark the in-memory stages only
+        stages['read'] = {'skipped': f"more than {MAX_SHEET_ROWS} rows do not fit on one worksheet"}
+        alarm_df = arg.apply_schema(alarm_raw[list(arg.REPORT_SCHEMAS['alarm'])].copy(), arg.REPORT_SCHEMAS['alarm'])
+        offline_df = arg.apply_schema(offline_raw[list(arg.REPORT_SCHEMAS['offline'])].copy(), arg.REPORT_SCHEMAS['offline'])
+        return alarm_df, offline_df
+
+    alarm_path = os.path.join(data_dir, f"Current Alarms {alarm_rows}-{seed}.xlsx")
+    offline_path = os.path.join(data_dir, f"Offline Report {offline_rows}-{seed}.xlsx")
+    if not os.path.exists(alarm_path):
+        write_report(alarm_raw, alarm_path, 'Current Alarms', REPORT_TIME)
+    if not os.path.exists(offline_path):
+        write_report(offline_raw, offline_path, 'Offline Report', REPORT_TIME)
+
+    with open(alarm_path, 'rb') as f:
+        alarm_data = f.read()
+    with open(offline_path, 'rb') as f:
+        offline_data = f.read()
+    (alarm_df, _), stages['read:alarm'] = measure(
+        lambda: arg.parse_report(alarm_data, arg.REPORT_SCHEMAS['alarm']), track_memory)
+    (offline_df, _), stages['read:offline'] = measure(
+        lambda: arg.parse_report(offline_data, arg.REPORT_SCHEMAS['offline']), track_memory)
+    return alarm_df, offline_df
+
+# Function to benchmark every pipeline stage for one report size
+def run_size(alarm_rows, offline_rows, seed, data_dir, track_memory):
+    stages = {}
+    alarm_df, offline_df = load_frames(alarm_rows, offline_rows, seed, data_dir, stages, track_memory)
+
+    _, stages['client_extraction'] = measure(lambda: arg.extract_clients(alarm_df['Site Alias']), track_memory)
+    _, stages['bucketing'] = measure(lambda: arg.categorize_durations(alarm_df['Duration Slot (Hours)']), track_memory)
+
+    alarm_df = alarm_df[~alarm_df['Client'].isnull()]
+    cube, stages['alarm_cube'] = measure(lambda: arg.build_alarm_cube(alarm_df), track_memory)
+    alarm_names = arg.order_alarm_names(sorted(alarm_df['Alarm Name'].dropna().unique().tolist()))
+    alarm_data = {}
+    for alarm_name in alarm_names:
+        alarm_data[alarm_name], stages[f"pivot:{alarm_name}"] = measure(
+            lambda: arg.pivot_from_cube(cube, alarm_name), track_memory)
+
+    offline_data, stages['offline_pivot'] = measure(lambda: arg.create_offline_pivot(offline_df), track_memory)
+    offline_summary_df, stages['calculate_duration'] = measure(
+        lambda: arg.calculate_duration(offline_df, REPORT_TIME), track_memory)
+
+    # Blanked Cluster names and Total rows are only laid out for display and export
+    def layout_all():
+        return {name: arg.format_pivot(*data) for name, data in alarm_data.items()}, arg.format_pivot(*offline_data)
+    (alarm_tables, pivot_offline), stages['layout'] = measure(layout_all, track_memory)
+
+    # Styler work happens at render time, so the HTML is rendered as part of the stage
+    def style_all():
+        for pivot in alarm_tables.values():
+            arg.style_dataframe(pivot, arg.duration_labels(), False).to_html()
+        arg.style_dataframe(pivot_offline, arg.offline_duration_labels(), False).to_html()
+    _, stages['styling'] = measure(style_all, track_memory)
+
+    _, stages['export:alarms'] = measure(lambda: arg.to_excel(alarm_tables), track_memory)
+    _, stages['export:offline_summary'] = measure(
+        lambda: arg.to_excel({"Offline Summary": offline_summary_df}), track_memory)
+
+    return {'alarm_rows': alarm_rows, 'offline_rows': offline_rows, 'stages': stages}
+
+# Function to describe the code and environment a result file was produced with
+def run_metadata():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+    }
+
+# Function to print per-stage changes against a baseline result file
+def compare_results(results, baseline):
+    baseline_runs = {(run['alarm_rows'], run['offline_rows']): run for run in baseline['runs']}
+    for run in results['runs']:
+        base = baseline_runs.get((run['alarm_rows'], run['offline_rows']))
+        if base is None:
+            continue
+        print(f"\n{run['alarm_rows']} alarm rows / {run['offline_rows']} offline rows "
+              f"(baseline {baseline['meta'].get('commit')})")
+        for stage, current in run['stages'].items():
+            previous = base['stages'].get(stage)
+            if not previous or 'seconds' not in current or 'seconds' not in previous:
+                continue
+            ratio = current['seconds'] / previous['seconds'] if previous['seconds'] else float('inf')
+            print(f"  {stage:<40} {previous['seconds']:>10.4f}s -> {current['seconds']:>10.4f}s  x{ratio:.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark each StatusMatrix pipeline stage on synthetic reports.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000], help="alarm rows per run")
+    parser.add_argument('--offline-rows', type=int, help="offline rows (default: a fifth of the alarm rows)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', help="where generated workbooks are kept between runs (default: a temp dir)")
+    parser.add_argument('--no-memory', action='store_true', help="skip the traced peak memory runs")
+    parser.add_argument('--output', default='bench_results.json', help="JSON file the results are written to")
+    parser.add_argument('--baseline', help="earlier result file to compare against")
+    args = parser.parse_args(argv)
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix='statusmatrix-bench-')
+    os.makedirs(data_dir, exist_ok=True)
+
+    results = {'meta': run_metadata(), 'runs': []}
+    for rows in args.rows:
+        offline_rows = args.offline_rows if args.offline_rows is not None else max(1, rows // 5)
+        print(f"Benchmarking {rows} alarm rows / {offline_rows} offline rows ...")
+        results['runs'].append(run_size(rows, offline_rows, args.seed, data_dir, not args.no_memory))
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare_results(results, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
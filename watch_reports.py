@@ -0,0 +1,105 @@
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from AlarmReportGenerator import (
+    PRECOMPUTED_DIR, PRECOMPUTED_MANIFEST_FILE, SNAPSHOT_DIR, hash_upload, precomputed_file_name, run_report_pipeline,
+    save_precomputed_report,
+)
+from batch_report import find_report_pairs, read_pair
+
+# Seconds between two scans of the watched directory
+WATCH_INTERVAL_SECONDS = 10
+
+# Function to fingerprint the files of a pair by size and modification time (None while one is missing)
+def pair_signature(alarm_path, offline_path):
+    try:
+        return tuple((stat.st_size, stat.st_mtime_ns) for stat in (os.stat(alarm_path), os.stat(offline_path)))
+    except FileNotFoundError:
+        return None
+
+# Function to run the pipeline on one pair and store the result for the page, unless that content is stored already
+def precompute_pair(key, alarm_path, offline_path, precomputed_dir, snapshot_dir=None):
+    alarm_data, offline_data = read_pair(key, alarm_path, offline_path)
+
+    # Touched or re-copied files with the same content are not computed again, also across restarts
+    file_name = precomputed_file_name(key, hash_upload(alarm_data), hash_upload(offline_data))
+    path = os.path.join(precomputed_dir, file_name)
+    if os.path.exists(os.path.join(path, PRECOMPUTED_MANIFEST_FILE)):
+        return path
+
+    result = run_report_pipeline(alarm_data, offline_data, snapshot_dir)
+    return save_precomputed_report(key, result, file_name, precomputed_dir)
+
+# Function to report the finished precompute jobs and remember the signatures they covered
+def collect_finished(running, done):
+    for future in [future for future in running if future.done()]:
+        key, signature = running.pop(future)
+        # A failed pair is not retried until its files change
+        done[key] = signature
+        try:
+            print(f"{key}: precomputed {future.result()}")
+        except Exception as e:
+            print(f"{key}: failed: {e}", file=sys.stderr)
+
+# Function to scan a directory for new or changed pairs and precompute them in worker processes.
+# A pair is picked up once two scans in a row see the same files, so half-copied workbooks are skipped.
+def watch(watch_dir, precomputed_dir, interval=WATCH_INTERVAL_SECONDS, workers=None, snapshot_dir=None, once=False):
+    done, last_seen, running = {}, {}, {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            pairs, _ = find_report_pairs(watch_dir)
+            busy = {key for key, _ in running.values()}
+            for key, alarm_path, offline_path in pairs:
+                signature = pair_signature(alarm_path, offline_path)
+                if signature is None or done.get(key) == signature or key in busy:
+                    continue
+                if not once and last_seen.get(key) != signature:
+                    last_seen[key] = signature
+                    continue
+                future = executor.submit(precompute_pair, key, alarm_path, offline_path, precomputed_dir, snapshot_dir)
+                running[future] = (key, signature)
+
+            if once:
+                while running:
+                    time.sleep(0.1)
+                    collect_finished(running, done)
+                return
+            time.sleep(interval)
+            collect_finished(running, done)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Watch a directory for alarm/offline workbook pairs and precompute their StatusMatrix reports."
+    )
+    parser.add_argument('watch_dir', help="directory the Current Alarms and Offline Report workbooks are dropped into")
+    parser.add_argument('--precomputed-dir', default=PRECOMPUTED_DIR,
+                        help=f"where to store the precomputed reports the page opens (default: {PRECOMPUTED_DIR})")
+    parser.add_argument('-i', '--interval', type=float, default=WATCH_INTERVAL_SECONDS,
+                        help=f"seconds between scans (default: {WATCH_INTERVAL_SECONDS})")
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help="number of worker processes (default: 1)")
+    parser.add_argument('--snapshot-dir', default=SNAPSHOT_DIR,
+                        help=f"where to keep columnar snapshots of the ingested reports; '' disables them (default: {SNAPSHOT_DIR})")
+    parser.add_argument('--once', action='store_true',
+                        help="precompute the pairs present now and exit instead of watching")
+    parser.add_argument('--log-level', default='WARNING',
+                        help="level of the structured stage log lines, e.g. INFO (default: WARNING)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+
+    if not os.path.isdir(args.watch_dir):
+        print(f"Not a directory: {args.watch_dir}", file=sys.stderr)
+        return 1
+    try:
+        watch(args.watch_dir, args.precomputed_dir, args.interval, max(1, args.workers), args.snapshot_dir, args.once)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())